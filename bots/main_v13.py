@@ -0,0 +1,2164 @@
+import gc
+import os
+import random
+import struct
+import threading
+import time
+from array import array
+
+# Start-up costs in seconds: module import, background warm-up, first move
+STARTUP = {}
+_import_start = time.perf_counter()
+
+# NumPy is only needed by the NNUE evaluator and costs more to import than
+# the rest of the engine, so it is loaded on first use
+np = None
+_numpy_missing = False
+
+def import_numpy():
+    """The numpy module, imported on first call; None when it is not installed"""
+    global np, _numpy_missing
+    if np is None and not _numpy_missing:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            _numpy_missing = True
+    return np
+
+# Piece codes: low three bits hold the type, bit 3 holds the colour
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = 1, 2, 3, 4, 5, 6
+WHITE, BLACK = 0, 1
+
+PIECE_CHARS = ' PNBRQK  pnbrqk'
+CHAR_PIECES = {c: i for i, c in enumerate(PIECE_CHARS) if c != ' '}
+PROMO_CHARS = '  nbrq'
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+MATE_SCORE = 99999
+MATE_BOUND = 9000
+
+# Material for the middlegame and the endgame, blended by game phase
+MIDGAME_VALUES = {'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 0}
+ENDGAME_VALUES = {'P': 120, 'N': 300, 'B': 320, 'R': 520, 'Q': 930, 'K': 0}
+
+# Piece-square tables (white's point of view, a8 first)
+MIDGAME_PST = {
+    'P': [
+        0,  0,  0,  0,  0,  0,  0,  0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5,  5, 10, 25, 25, 10,  5,  5,
+        0,  0,  0, 20, 20,  0,  0,  0,
+        5, -5,-10,  0,  0,-10, -5,  5,
+        5, 10, 10,-20,-20, 10, 10,  5,
+        0,  0,  0,  0,  0,  0,  0,  0
+    ],
+    'N': [
+        -50,-40,-30,-30,-30,-30,-40,-50,
+        -40,-20,  0,  0,  0,  0,-20,-40,
+        -30,  0, 10, 15, 15, 10,  0,-30,
+        -30,  5, 15, 20, 20, 15,  5,-30,
+        -30,  0, 15, 20, 20, 15,  0,-30,
+        -30,  5, 10, 15, 15, 10,  5,-30,
+        -40,-20,  0,  5,  5,  0,-20,-40,
+        -50,-40,-30,-30,-30,-30,-40,-50
+    ],
+    'B': [
+        -20,-10,-10,-10,-10,-10,-10,-20,
+        -10,  0,  0,  0,  0,  0,  0,-10,
+        -10,  0,  5, 10, 10,  5,  0,-10,
+        -10,  5,  5, 10, 10,  5,  5,-10,
+        -10,  0, 10, 10, 10, 10,  0,-10,
+        -10, 10, 10, 10, 10, 10, 10,-10,
+        -10,  5,  0,  0,  0,  0,  5,-10,
+        -20,-10,-10,-10,-10,-10,-10,-20
+    ],
+    'R': [
+        0,  0,  0,  0,  0,  0,  0,  0,
+        5, 10, 10, 10, 10, 10, 10,  5,
+        -5,  0,  0,  0,  0,  0,  0, -5,
+        -5,  0,  0,  0,  0,  0,  0, -5,
+        -5,  0,  0,  0,  0,  0,  0, -5,
+        -5,  0,  0,  0,  0,  0,  0, -5,
+        -5,  0,  0,  0,  0,  0,  0, -5,
+        0,  0,  0,  5,  5,  0,  0,  0
+    ],
+    'Q': [
+        -20,-10,-10, -5, -5,-10,-10,-20,
+        -10,  0,  0,  0,  0,  0,  0,-10,
+        -10,  0,  5,  5,  5,  5,  0,-10,
+        -5,  0,  5,  5,  5,  5,  0, -5,
+        0,  0,  5,  5,  5,  5,  0, -5,
+        -10,  5,  5,  5,  5,  5,  0,-10,
+        -10,  0,  5,  0,  0,  0,  0,-10,
+        -20,-10,-10, -5, -5,-10,-10,-20
+    ],
+    'K': [
+        -30,-40,-40,-50,-50,-40,-40,-30,
+        -30,-40,-40,-50,-50,-40,-40,-30,
+        -30,-40,-40,-50,-50,-40,-40,-30,
+        -30,-40,-40,-50,-50,-40,-40,-30,
+        -20,-30,-30,-40,-40,-30,-30,-20,
+        -10,-20,-20,-20,-20,-20,-20,-10,
+        20, 20,  0,  0,  0,  0, 20, 20,
+        20, 30, 10,  0,  0, 10, 30, 20
+    ]
+}
+
+ENDGAME_PST = {
+    'P': [
+        0,  0,  0,  0,  0,  0,  0,  0,
+        80, 80, 80, 80, 80, 80, 80, 80,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        30, 30, 30, 40, 40, 30, 30, 30,
+        20, 20, 20, 30, 30, 20, 20, 20,
+        10, 10, 10, 15, 15, 10, 10, 10,
+        5,  5,  5, 10, 10,  5,  5,  5,
+        0,  0,  0,  0,  0,  0,  0,  0
+    ],
+    'N': [
+        -50,-40,-30,-30,-30,-30,-40,-50,
+        -40,-20,  0,  0,  0,  0,-20,-40,
+        -30,  0, 10, 15, 15, 10,  0,-30,
+        -30,  5, 15, 20, 20, 15,  5,-30,
+        -30,  0, 15, 20, 20, 15,  0,-30,
+        -30,  5, 10, 15, 15, 10,  5,-30,
+        -40,-20,  0,  5,  5,  0,-20,-40,
+        -50,-40,-30,-30,-30,-30,-40,-50
+    ],
+    'B': [
+        -20,-10,-10,-10,-10,-10,-10,-20,
+        -10,  0,  0,  0,  0,  0,  0,-10,
+        -10,  0,  5, 10, 10,  5,  0,-10,
+        -10,  5,  5, 10, 10,  5,  5,-10,
+        -10,  0, 10, 10, 10, 10,  0,-10,
+        -10, 10, 10, 10, 10, 10, 10,-10,
+        -10,  5,  0,  0,  0,  0,  5,-10,
+        -20,-10,-10,-10,-10,-10,-10,-20
+    ],
+    'R': [
+        0,  0,  0,  0,  0,  0,  0,  0,
+        10, 10, 10, 10, 10, 10, 10, 10,
+        0,  0,  0,  0,  0,  0,  0,  0,
+        0,  0,  0,  0,  0,  0,  0,  0,
+        0,  0,  0,  0,  0,  0,  0,  0,
+        0,  0,  0,  0,  0,  0,  0,  0,
+        0,  0,  0,  0,  0,  0,  0,  0,
+        0,  0,  0,  0,  0,  0,  0,  0
+    ],
+    'Q': [
+        -20,-10,-10, -5, -5,-10,-10,-20,
+        -10,  0,  0,  0,  0,  0,  0,-10,
+        -10,  0,  5,  5,  5,  5,  0,-10,
+        -5,  0,  5,  5,  5,  5,  0, -5,
+        -5,  0,  5,  5,  5,  5,  0, -5,
+        -10,  0,  5,  5,  5,  5,  0,-10,
+        -10,  0,  0,  0,  0,  0,  0,-10,
+        -20,-10,-10, -5, -5,-10,-10,-20
+    ],
+    'K': [
+        -20,-10,-10,-10,-10,-10,-10,-20,
+        -10,  0, 10, 10, 10, 10,  0,-10,
+        -10, 10, 20, 20, 20, 20, 10,-10,
+        -10, 10, 20, 30, 30, 20, 10,-10,
+        -10, 10, 20, 30, 30, 20, 10,-10,
+        -10, 10, 20, 20, 20, 20, 10,-10,
+        -10,  0, 10, 10, 10, 10,  0,-10,
+        -20,-10,-10,-10,-10,-10,-10,-20
+    ]
+}
+
+# Game phase: 24 with all minor and major pieces on, 0 with none
+PHASE_WEIGHTS = [0, 0, 1, 1, 2, 4, 0]
+PHASE_MAX = 24
+ENDGAME_PHASE = 6
+
+# Square indices follow Chessnut: a8 = 0, h8 = 7, a1 = 56, h1 = 63
+def xy2i(pos_xy):
+    """Convert algebraic notation to board index"""
+    return (8 - int(pos_xy[1])) * 8 + (ord(pos_xy[0]) - 97)
+
+def i2xy(idx):
+    """Convert a board index to algebraic notation"""
+    return chr(97 + idx % 8) + str(8 - idx // 8)
+
+def _build_leaper_table(offsets):
+    table = []
+    for sq in range(64):
+        rank, file = sq // 8, sq % 8
+        targets = []
+        for dr, df in offsets:
+            r, f = rank + dr, file + df
+            if 0 <= r < 8 and 0 <= f < 8:
+                targets.append(r * 8 + f)
+        table.append(tuple(targets))
+    return table
+
+def _build_ray_table(directions):
+    table = []
+    for sq in range(64):
+        rank, file = sq // 8, sq % 8
+        rays = []
+        for dr, df in directions:
+            ray = []
+            r, f = rank + dr, file + df
+            while 0 <= r < 8 and 0 <= f < 8:
+                ray.append(r * 8 + f)
+                r, f = r + dr, f + df
+            if ray:
+                rays.append(tuple(ray))
+        table.append(tuple(rays))
+    return table
+
+KNIGHT_ATTACKS = _build_leaper_table([(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                                      (1, -2), (1, 2), (2, -1), (2, 1)])
+KING_ATTACKS = _build_leaper_table([(-1, -1), (-1, 0), (-1, 1), (0, -1),
+                                    (0, 1), (1, -1), (1, 0), (1, 1)])
+ROOK_RAYS = _build_ray_table([(-1, 0), (1, 0), (0, -1), (0, 1)])
+BISHOP_RAYS = _build_ray_table([(-1, -1), (-1, 1), (1, -1), (1, 1)])
+QUEEN_RAYS = [ROOK_RAYS[sq] + BISHOP_RAYS[sq] for sq in range(64)]
+# PAWN_ATTACKS[colour][sq]: squares attacked by a pawn of that colour on sq
+PAWN_ATTACKS = [_build_leaper_table([(-1, -1), (-1, 1)]),
+                _build_leaper_table([(1, -1), (1, 1)])]
+
+# Castling rights bits and the rights kept when a square is touched
+CASTLE_K, CASTLE_Q, CASTLE_k, CASTLE_q = 1, 2, 4, 8
+CASTLE_MASK = [15] * 64
+CASTLE_MASK[0] = 15 & ~CASTLE_q
+CASTLE_MASK[4] = 15 & ~(CASTLE_k | CASTLE_q)
+CASTLE_MASK[7] = 15 & ~CASTLE_k
+CASTLE_MASK[56] = 15 & ~CASTLE_Q
+CASTLE_MASK[60] = 15 & ~(CASTLE_K | CASTLE_Q)
+CASTLE_MASK[63] = 15 & ~CASTLE_K
+# King destination -> (rook from, rook to)
+CASTLE_ROOK = {62: (63, 61), 58: (56, 59), 6: (7, 5), 2: (0, 3)}
+
+# Zobrist keys from a fixed seed so hashes are stable between runs
+_zobrist_rng = random.Random(20241213)
+PIECE_KEYS = [[_zobrist_rng.getrandbits(64) for _ in range(64)] for _ in range(15)]
+CASTLE_KEYS = [_zobrist_rng.getrandbits(64) for _ in range(16)]
+EP_KEYS = [_zobrist_rng.getrandbits(64) for _ in range(8)]
+SIDE_KEY = _zobrist_rng.getrandbits(64)
+
+def _build_cuckoo():
+    """
+    Cuckoo hash of the key change made by every reversible piece move
+    (piece on s1 <-> s2 plus the side to move), with the squares between s1
+    and s2, so a single lookup tells whether one move links two positions
+    """
+    keys = [0] * 8192
+    moves = [0] * 8192
+    between = {}
+    for piece in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+        for colour_bit in (0, 8):
+            for s1 in range(64):
+                if piece == KNIGHT:
+                    paths = [(s2,) for s2 in KNIGHT_ATTACKS[s1]]
+                elif piece == KING:
+                    paths = [(s2,) for s2 in KING_ATTACKS[s1]]
+                else:
+                    rays = {BISHOP: BISHOP_RAYS, ROOK: ROOK_RAYS, QUEEN: QUEEN_RAYS}[piece][s1]
+                    paths = [ray[:i + 1] for ray in rays for i in range(len(ray))]
+                for path in paths:
+                    s2 = path[-1]
+                    if s2 < s1:
+                        continue
+                    move = s1 | s2 << 6
+                    between[move] = path[:-1]
+                    key = PIECE_KEYS[piece | colour_bit][s1] ^ PIECE_KEYS[piece | colour_bit][s2] ^ SIDE_KEY
+                    i = key & 0x1fff
+                    while move:
+                        keys[i], key = key, keys[i]
+                        moves[i], move = move, moves[i]
+                        i = (key >> 16) & 0x1fff if i == key & 0x1fff else key & 0x1fff
+    return keys, moves, between
+
+# (keys, moves, between), built on the first cycle check or by the warm-up
+# thread rather than at import
+_cuckoo = None
+
+def get_cuckoo():
+    global _cuckoo
+    if _cuckoo is None:
+        with _init_lock:
+            if _cuckoo is None:
+                _cuckoo = _build_cuckoo()
+    return _cuckoo
+
+def pack_score(mg, eg):
+    """Middlegame and endgame scores packed into one int"""
+    return (eg << 16) + mg
+
+def unpack_score(packed):
+    eg = (packed + 0x8000) >> 16
+    return packed - (eg << 16), eg
+
+def _build_psq():
+    """PSQ[piece][sq]: packed material + placement, negated for black"""
+    psq = [[0] * 64 for _ in range(15)]
+    for char in 'PNBRQK':
+        white = CHAR_PIECES[char]
+        for sq in range(64):
+            packed = pack_score(MIDGAME_VALUES[char] + MIDGAME_PST[char][sq],
+                                ENDGAME_VALUES[char] + ENDGAME_PST[char][sq])
+            psq[white][sq] = packed
+            psq[white | 8][sq ^ 56] = -packed
+    return psq
+
+PSQ = _build_psq()
+
+# Moves are ints: from | to << 6 | promotion type << 12
+def encode_move(frm, to, promo=0):
+    return frm | (to << 6) | (promo << 12)
+
+def move_to_uci(move):
+    """Convert an encoded move to UCI notation (e.g. "e7e8q")"""
+    uci = i2xy(move & 63) + i2xy((move >> 6) & 63)
+    if move >> 12:
+        uci += PROMO_CHARS[move >> 12]
+    return uci
+
+
+class Position(object):
+    """
+    Mutable board with make/unmake and a Chessnut-like facade.
+
+    Unlike `Chessnut.Game`, nothing is computed eagerly when a move is
+    applied: check is answered from the attack tables on demand, and
+    checkmate/stalemate is only decided once a node has no legal moves.
+    """
+
+    NORMAL = 0
+    CHECK = 1
+    CHECKMATE = 2
+    STALEMATE = 3
+
+    def __init__(self, fen=START_FEN):
+        self.set_fen(fen)
+
+    def set_fen(self, fen):
+        """Load a FEN string, clearing the undo stack"""
+        fields = fen.split()
+        squares = []
+        for char in fields[0]:
+            if char == '/':
+                continue
+            elif char.isdigit():
+                squares.extend([EMPTY] * int(char))
+            else:
+                squares.append(CHAR_PIECES[char])
+        self.squares = squares
+        self.side = WHITE if fields[1] == 'w' else BLACK
+        self.castling = 0
+        for char, bit in (('K', CASTLE_K), ('Q', CASTLE_Q), ('k', CASTLE_k), ('q', CASTLE_q)):
+            if len(fields) > 2 and char in fields[2]:
+                self.castling |= bit
+        self.ep = xy2i(fields[3]) if len(fields) > 3 and fields[3] != '-' else -1
+        self.halfmove = int(fields[4]) if len(fields) > 4 else 0
+        self.fullmove = int(fields[5]) if len(fields) > 5 else 1
+        self.kings = [squares.index(KING), squares.index(KING | 8)]
+        self.stack = []
+        # Keys of earlier game positions, oldest first, for repetition checks
+        self.history = []
+        self.key = self.compute_key()
+        self.pawn_key = self.compute_pawn_key()
+        self.psq, self.phase = self.compute_psq()
+
+    def compute_pawn_key(self):
+        """Zobrist hash of the pawns alone, for the pawn hash table"""
+        key = 0
+        for sq, piece in enumerate(self.squares):
+            if piece & 7 == PAWN:
+                key ^= PIECE_KEYS[piece][sq]
+        return key
+
+    def compute_psq(self):
+        """Packed piece-square sum and game phase from scratch"""
+        psq = phase = 0
+        for sq, piece in enumerate(self.squares):
+            if piece:
+                psq += PSQ[piece][sq]
+                phase += PHASE_WEIGHTS[piece & 7]
+        return psq, phase
+
+    def compute_key(self):
+        """Zobrist hash of the current position from scratch"""
+        key = 0
+        for sq, piece in enumerate(self.squares):
+            if piece:
+                key ^= PIECE_KEYS[piece][sq]
+        key ^= CASTLE_KEYS[self.castling]
+        if self.ep >= 0:
+            key ^= EP_KEYS[self.ep & 7]
+        if self.side == BLACK:
+            key ^= SIDE_KEY
+        return key
+
+    @property
+    def fen(self):
+        rows = []
+        for rank in range(8):
+            row, empty = '', 0
+            for piece in self.squares[rank * 8:rank * 8 + 8]:
+                if piece:
+                    if empty:
+                        row += str(empty)
+                        empty = 0
+                    row += PIECE_CHARS[piece]
+                else:
+                    empty += 1
+            if empty:
+                row += str(empty)
+            rows.append(row)
+        rights = ''.join(c for c, bit in (('K', CASTLE_K), ('Q', CASTLE_Q),
+                                          ('k', CASTLE_k), ('q', CASTLE_q))
+                         if self.castling & bit) or '-'
+        ep = i2xy(self.ep) if self.ep >= 0 else '-'
+        return '%s %s %s %s %d %d' % ('/'.join(rows), 'wb'[self.side], rights,
+                                      ep, self.halfmove, self.fullmove)
+
+    def get_fen(self):
+        return self.fen
+
+    def get_piece(self, index):
+        """Piece character on a square, ' ' when empty (Chessnut style)"""
+        return PIECE_CHARS[self.squares[index]]
+
+    def attacked(self, sq, by):
+        """Is `sq` attacked by any piece of colour `by`"""
+        squares = self.squares
+        offset = by << 3
+        pawn = offset | PAWN
+        for s in PAWN_ATTACKS[by ^ 1][sq]:
+            if squares[s] == pawn:
+                return True
+        knight = offset | KNIGHT
+        for s in KNIGHT_ATTACKS[sq]:
+            if squares[s] == knight:
+                return True
+        king = offset | KING
+        for s in KING_ATTACKS[sq]:
+            if squares[s] == king:
+                return True
+        rook, queen = offset | ROOK, offset | QUEEN
+        for ray in ROOK_RAYS[sq]:
+            for s in ray:
+                piece = squares[s]
+                if piece:
+                    if piece == rook or piece == queen:
+                        return True
+                    break
+        bishop = offset | BISHOP
+        for ray in BISHOP_RAYS[sq]:
+            for s in ray:
+                piece = squares[s]
+                if piece:
+                    if piece == bishop or piece == queen:
+                        return True
+                    break
+        return False
+
+    def evaluate(self):
+        """Static evaluation from white's point of view"""
+        return evaluate_position(self)
+
+    def in_check(self):
+        """Is the side to move in check"""
+        return self.attacked(self.kings[self.side], self.side ^ 1)
+
+    def make_move(self, move):
+        squares = self.squares
+        frm, to, promo = move & 63, (move >> 6) & 63, move >> 12
+        piece = squares[frm]
+        captured = squares[to]
+        us = self.side
+        self.stack.append((move, captured, self.castling, self.ep, self.halfmove,
+                           self.key, self.psq, self.phase, self.pawn_key))
+
+        key = self.key ^ SIDE_KEY ^ CASTLE_KEYS[self.castling]
+        if self.ep >= 0:
+            key ^= EP_KEYS[self.ep & 7]
+        psq = self.psq - PSQ[piece][frm]
+
+        ptype = piece & 7
+        self.halfmove += 1
+        if captured:
+            key ^= PIECE_KEYS[captured][to]
+            psq -= PSQ[captured][to]
+            self.phase -= PHASE_WEIGHTS[captured & 7]
+            self.halfmove = 0
+            if captured & 7 == PAWN:
+                self.pawn_key ^= PIECE_KEYS[captured][to]
+        if ptype == PAWN:
+            self.halfmove = 0
+            self.pawn_key ^= PIECE_KEYS[piece][frm]
+            if not promo:
+                self.pawn_key ^= PIECE_KEYS[piece][to]
+            if to == self.ep:
+                cap_sq = to + 8 if us == WHITE else to - 8
+                key ^= PIECE_KEYS[squares[cap_sq]][cap_sq]
+                psq -= PSQ[squares[cap_sq]][cap_sq]
+                self.pawn_key ^= PIECE_KEYS[squares[cap_sq]][cap_sq]
+                squares[cap_sq] = EMPTY
+        elif ptype == KING:
+            self.kings[us] = to
+            if to - frm == 2 or frm - to == 2:
+                rook_from, rook_to = CASTLE_ROOK[to]
+                rook = squares[rook_from]
+                squares[rook_to] = rook
+                squares[rook_from] = EMPTY
+                key ^= PIECE_KEYS[rook][rook_from] ^ PIECE_KEYS[rook][rook_to]
+                psq += PSQ[rook][rook_to] - PSQ[rook][rook_from]
+
+        squares[frm] = EMPTY
+        key ^= PIECE_KEYS[piece][frm]
+        if promo:
+            piece = promo | (us << 3)
+            self.phase += PHASE_WEIGHTS[promo]
+        squares[to] = piece
+        key ^= PIECE_KEYS[piece][to]
+        self.psq = psq + PSQ[piece][to]
+
+        self.ep = -1
+        if ptype == PAWN and (to - frm == 16 or frm - to == 16):
+            self.ep = (frm + to) >> 1
+            key ^= EP_KEYS[self.ep & 7]
+        self.castling &= CASTLE_MASK[frm] & CASTLE_MASK[to]
+        key ^= CASTLE_KEYS[self.castling]
+        if us == BLACK:
+            self.fullmove += 1
+        self.side = us ^ 1
+        self.key = key
+
+    def unmake_move(self):
+        (move, captured, self.castling, self.ep, self.halfmove,
+         self.key, self.psq, self.phase, self.pawn_key) = self.stack.pop()
+        squares = self.squares
+        frm, to, promo = move & 63, (move >> 6) & 63, move >> 12
+        self.side = us = self.side ^ 1
+        if us == BLACK:
+            self.fullmove -= 1
+        piece = squares[to]
+        if promo:
+            piece = PAWN | (us << 3)
+        squares[frm] = piece
+        squares[to] = captured
+        ptype = piece & 7
+        if ptype == PAWN and to == self.ep:
+            cap_sq = to + 8 if us == WHITE else to - 8
+            squares[cap_sq] = PAWN | ((us ^ 1) << 3)
+        elif ptype == KING:
+            self.kings[us] = frm
+            if to - frm == 2 or frm - to == 2:
+                rook_from, rook_to = CASTLE_ROOK[to]
+                squares[rook_from] = squares[rook_to]
+                squares[rook_to] = EMPTY
+
+    def is_legal(self, move):
+        """Make the move and test whether it left our own king attacked"""
+        us = self.side
+        self.make_move(move)
+        legal = not self.attacked(self.kings[us], us ^ 1)
+        self.unmake_move()
+        return legal
+
+    def checks_and_pins(self):
+        """
+        Checkers and pinned pieces of the side to move, found by walking
+        the rays out of the king once.
+
+        Returns (checkers, pinned): checkers is a list of (square, block
+        squares) where the block squares run from the king to and including
+        the checker; pinned maps a pinned piece's square to the line it may
+        still move along.
+        """
+        squares = self.squares
+        us = self.side
+        ksq = self.kings[us]
+        them_bit = (us ^ 1) << 3
+        checkers = []
+        pinned = {}
+        for rays, slider in ((ROOK_RAYS, ROOK), (BISHOP_RAYS, BISHOP)):
+            for ray in rays[ksq]:
+                blocker = -1
+                for i, s in enumerate(ray):
+                    piece = squares[s]
+                    if not piece:
+                        continue
+                    if (piece & 8) != them_bit:
+                        if blocker >= 0:
+                            break
+                        blocker = s
+                        continue
+                    ptype = piece & 7
+                    if ptype == slider or ptype == QUEEN:
+                        if blocker >= 0:
+                            pinned[blocker] = ray[:i + 1]
+                        else:
+                            checkers.append((s, ray[:i + 1]))
+                    break
+        knight = them_bit | KNIGHT
+        for s in KNIGHT_ATTACKS[ksq]:
+            if squares[s] == knight:
+                checkers.append((s, (s,)))
+        pawn = them_bit | PAWN
+        for s in PAWN_ATTACKS[us][ksq]:
+            if squares[s] == pawn:
+                checkers.append((s, (s,)))
+        return checkers, pinned
+
+    def is_legal_unchecked(self, move, pinned):
+        """Legality of a pseudo-legal move when not in check, from the pin map"""
+        frm = move & 63
+        to = (move >> 6) & 63
+        ptype = self.squares[frm] & 7
+        if ptype == KING:
+            # Castling squares were already tested by the generator
+            return to - frm == 2 or frm - to == 2 or not self.attacked(to, self.side ^ 1)
+        if ptype == PAWN and to == self.ep:
+            # The rare horizontal pin through both pawns needs a real test
+            return self.is_legal(move)
+        line = pinned.get(frm)
+        return line is None or to in line
+
+    def legal_moves(self):
+        checkers, pinned = self.checks_and_pins()
+        moves = []
+        if checkers:
+            generate_evasions(self, checkers, pinned, moves)
+            return moves
+        generate_captures(self, moves)
+        generate_quiets(self, moves)
+        return [m for m in moves if self.is_legal_unchecked(m, pinned)]
+
+    def is_pseudo_legal(self, move):
+        """Could `move` be generated here; guards hash and killer moves"""
+        squares = self.squares
+        frm, to, promo = move & 63, (move >> 6) & 63, move >> 12
+        piece = squares[frm]
+        if not piece or (piece >> 3) != self.side or frm == to:
+            return False
+        target = squares[to]
+        if target and (target >> 3) == self.side:
+            return False
+        ptype = piece & 7
+        if ptype == PAWN:
+            forward = -8 if self.side == WHITE else 8
+            if (to < 8 or to >= 56) != bool(promo):
+                return False
+            if to in PAWN_ATTACKS[self.side][frm]:
+                return bool(target) or to == self.ep
+            if target:
+                return False
+            if to == frm + forward:
+                return True
+            start_lo = 48 if self.side == WHITE else 8
+            return (to == frm + 2 * forward and start_lo <= frm < start_lo + 8
+                    and not squares[frm + forward])
+        if promo:
+            return False
+        if ptype == KNIGHT:
+            return to in KNIGHT_ATTACKS[frm]
+        if ptype == KING:
+            if to in KING_ATTACKS[frm]:
+                return True
+            castles = []
+            _add_castling(self, castles)
+            return move in castles
+        rays = ROOK_RAYS if ptype == ROOK else BISHOP_RAYS if ptype == BISHOP else QUEEN_RAYS
+        for ray in rays[frm]:
+            if to in ray:
+                for s in ray:
+                    if s == to:
+                        return True
+                    if squares[s]:
+                        return False
+        return False
+
+    def check_squares(self):
+        """
+        Precomputed check information for the side to move.
+
+        Returns (direct, discovered): direct[piece type] holds the squares
+        from which that piece would attack the enemy king; discovered maps
+        each of our pieces shielding the enemy king from one of our sliders
+        to the line it must leave to uncover the check.
+        """
+        squares = self.squares
+        us_bit = self.side << 3
+        eksq = self.kings[self.side ^ 1]
+        rook_lines, bishop_lines = [], []
+        discovered = {}
+        for rays, lines, slider in ((ROOK_RAYS, rook_lines, ROOK),
+                                    (BISHOP_RAYS, bishop_lines, BISHOP)):
+            for ray in rays[eksq]:
+                blocker = -1
+                for i, s in enumerate(ray):
+                    piece = squares[s]
+                    if blocker < 0:
+                        lines.append(s)
+                    if not piece:
+                        continue
+                    if blocker >= 0:
+                        ptype = piece & 7
+                        if (piece & 8) == us_bit and (ptype == slider or ptype == QUEEN):
+                            discovered[blocker] = ray[:i + 1]
+                        break
+                    if (piece & 8) != us_bit:
+                        break
+                    blocker = s
+        rook_lines, bishop_lines = frozenset(rook_lines), frozenset(bishop_lines)
+        direct = (frozenset(), frozenset(PAWN_ATTACKS[self.side ^ 1][eksq]),
+                  frozenset(KNIGHT_ATTACKS[eksq]), bishop_lines, rook_lines,
+                  rook_lines | bishop_lines, frozenset())
+        return direct, discovered
+
+    def gives_check(self, move, check_info):
+        """Does a legal move check the opponent, without playing it out"""
+        frm, to, promo = move & 63, (move >> 6) & 63, move >> 12
+        ptype = self.squares[frm] & 7
+        if promo or (ptype == KING and (to - frm == 2 or frm - to == 2)) \
+                or (ptype == PAWN and to == self.ep):
+            # Promotions, castling and en passant move or remove a second
+            # piece; these are rare enough to just play out
+            self.make_move(move)
+            check = self.in_check()
+            self.unmake_move()
+            return check
+        direct, discovered = check_info
+        if to in direct[ptype]:
+            return True
+        line = discovered.get(frm)
+        return line is not None and to not in line
+
+    def parse_move(self, uci):
+        """Convert a UCI string to an encoded move"""
+        promo = PROMO_CHARS.index(uci[4].lower()) if len(uci) > 4 else 0
+        return encode_move(xy2i(uci[0:2]), xy2i(uci[2:4]), promo)
+
+    # Chessnut-compatible facade
+
+    def get_moves(self):
+        return [move_to_uci(m) for m in self.legal_moves()]
+
+    def apply_move(self, uci):
+        self.make_move(self.parse_move(uci))
+
+    @property
+    def status(self):
+        """Game status; only generates moves to tell mate from check"""
+        check = self.in_check()
+        if self.has_legal_move():
+            return Position.CHECK if check else Position.NORMAL
+        return Position.CHECKMATE if check else Position.STALEMATE
+
+    def game_keys(self):
+        """Keys of every earlier position known to this object, oldest first"""
+        return self.history + [entry[5] for entry in self.stack]
+
+    def is_repetition(self, ply):
+        """
+        True when the position occurred before since the last irreversible
+        move: once within the last `ply` moves (the search path) or twice
+        before them
+        """
+        end = self.halfmove
+        if end < 4:
+            return False
+        key = self.key
+        stack = self.stack
+        history = self.history
+        n = len(stack)
+        seen = 0
+        for back in range(4, end + 1, 2):
+            if back <= n:
+                if stack[n - back][5] != key:
+                    continue
+            elif back - n <= len(history):
+                if history[n - back] != key:
+                    continue
+            else:
+                break
+            if back <= ply:
+                return True
+            seen += 1
+            if seen == 2:
+                return True
+        return False
+
+    def is_draw(self, ply):
+        """Repetition or fifty-move rule (unless the last move mated)"""
+        if self.halfmove >= 100:
+            return not self.in_check() or self.has_legal_move()
+        return self.is_repetition(ply)
+
+    def has_game_cycle(self, ply):
+        """
+        True when one reversible move returns to a position on the search
+        path, so the side to move can at least force a repetition
+        """
+        end = min(self.halfmove, ply - 1)
+        if end < 3:
+            return False
+        cuckoo_keys, cuckoo_moves, cuckoo_between = _cuckoo or get_cuckoo()
+        key = self.key
+        stack = self.stack
+        squares = self.squares
+        n = len(stack)
+        for back in range(3, end + 1, 2):
+            move_key = key ^ stack[n - back][5]
+            i = move_key & 0x1fff
+            if cuckoo_keys[i] != move_key:
+                i = (move_key >> 16) & 0x1fff
+                if cuckoo_keys[i] != move_key:
+                    continue
+            for sq in cuckoo_between[cuckoo_moves[i]]:
+                if squares[sq]:
+                    break
+            else:
+                return True
+        return False
+
+    def has_legal_move(self):
+        checkers, pinned = self.checks_and_pins()
+        moves = []
+        if checkers:
+            generate_evasions(self, checkers, pinned, moves)
+            return bool(moves)
+        generate_captures(self, moves)
+        for move in moves:
+            if self.is_legal_unchecked(move, pinned):
+                return True
+        moves = []
+        generate_quiets(self, moves)
+        for move in moves:
+            if self.is_legal_unchecked(move, pinned):
+                return True
+        return False
+
+
+def _add_pawn_moves(moves, frm, to, promote, all_promotions):
+    if promote:
+        moves.append(frm | (to << 6) | (QUEEN << 12))
+        if all_promotions:
+            moves.append(frm | (to << 6) | (KNIGHT << 12))
+            moves.append(frm | (to << 6) | (ROOK << 12))
+            moves.append(frm | (to << 6) | (BISHOP << 12))
+    else:
+        moves.append(frm | (to << 6))
+
+def generate_captures(pos, moves):
+    """Pseudo-legal captures plus queen promotions"""
+    squares = pos.squares
+    us = pos.side
+    them_bit = (us ^ 1) << 3
+    forward = -8 if us == WHITE else 8
+    for frm in range(64):
+        piece = squares[frm]
+        if not piece or (piece >> 3) != us:
+            continue
+        ptype = piece & 7
+        if ptype == PAWN:
+            to = frm + forward
+            promote = to < 8 or to >= 56
+            if promote and not squares[to]:
+                moves.append(frm | (to << 6) | (QUEEN << 12))
+            for to in PAWN_ATTACKS[us][frm]:
+                target = squares[to]
+                if (target and (target & 8) == them_bit) or to == pos.ep:
+                    _add_pawn_moves(moves, frm, to, promote, True)
+        elif ptype == KNIGHT or ptype == KING:
+            table = KNIGHT_ATTACKS if ptype == KNIGHT else KING_ATTACKS
+            for to in table[frm]:
+                target = squares[to]
+                if target and (target & 8) == them_bit:
+                    moves.append(frm | (to << 6))
+        else:
+            rays = ROOK_RAYS if ptype == ROOK else BISHOP_RAYS if ptype == BISHOP else QUEEN_RAYS
+            for ray in rays[frm]:
+                for to in ray:
+                    target = squares[to]
+                    if target:
+                        if (target & 8) == them_bit:
+                            moves.append(frm | (to << 6))
+                        break
+
+def generate_quiets(pos, moves):
+    """Pseudo-legal non-captures, under-promotions and castling"""
+    squares = pos.squares
+    us = pos.side
+    forward = -8 if us == WHITE else 8
+    start_lo, start_hi = (48, 56) if us == WHITE else (8, 16)
+    for frm in range(64):
+        piece = squares[frm]
+        if not piece or (piece >> 3) != us:
+            continue
+        ptype = piece & 7
+        if ptype == PAWN:
+            to = frm + forward
+            if squares[to]:
+                continue
+            if to < 8 or to >= 56:
+                moves.append(frm | (to << 6) | (KNIGHT << 12))
+                moves.append(frm | (to << 6) | (ROOK << 12))
+                moves.append(frm | (to << 6) | (BISHOP << 12))
+                continue
+            moves.append(frm | (to << 6))
+            if start_lo <= frm < start_hi and not squares[to + forward]:
+                moves.append(frm | ((to + forward) << 6))
+        elif ptype == KNIGHT or ptype == KING:
+            table = KNIGHT_ATTACKS if ptype == KNIGHT else KING_ATTACKS
+            for to in table[frm]:
+                if not squares[to]:
+                    moves.append(frm | (to << 6))
+        else:
+            rays = ROOK_RAYS if ptype == ROOK else BISHOP_RAYS if ptype == BISHOP else QUEEN_RAYS
+            for ray in rays[frm]:
+                for to in ray:
+                    if squares[to]:
+                        break
+                    moves.append(frm | (to << 6))
+    _add_castling(pos, moves)
+
+def _add_castling(pos, moves):
+    squares = pos.squares
+    them = pos.side ^ 1
+    if pos.side == WHITE:
+        if pos.castling & CASTLE_K and not squares[61] and not squares[62] \
+                and not pos.attacked(60, them) and not pos.attacked(61, them) \
+                and not pos.attacked(62, them):
+            moves.append(60 | (62 << 6))
+        if pos.castling & CASTLE_Q and not squares[59] and not squares[58] \
+                and not squares[57] and not pos.attacked(60, them) \
+                and not pos.attacked(59, them) and not pos.attacked(58, them):
+            moves.append(60 | (58 << 6))
+    else:
+        if pos.castling & CASTLE_k and not squares[5] and not squares[6] \
+                and not pos.attacked(4, them) and not pos.attacked(5, them) \
+                and not pos.attacked(6, them):
+            moves.append(4 | (6 << 6))
+        if pos.castling & CASTLE_q and not squares[3] and not squares[2] \
+                and not squares[1] and not pos.attacked(4, them) \
+                and not pos.attacked(3, them) and not pos.attacked(2, them):
+            moves.append(4 | (2 << 6))
+
+
+def _origins_to(pos, to, capture):
+    """Squares of our non-king pieces that can move to `to`"""
+    squares = pos.squares
+    us = pos.side
+    us_bit = us << 3
+    origins = []
+    if capture:
+        pawn = us_bit | PAWN
+        for s in PAWN_ATTACKS[us ^ 1][to]:
+            if squares[s] == pawn:
+                origins.append(s)
+    elif 8 <= to < 56 or (to < 8) == (us == WHITE):
+        forward = -8 if us == WHITE else 8
+        s = to - forward
+        if squares[s] == us_bit | PAWN:
+            origins.append(s)
+        elif not squares[s] and (32 <= to < 40 if us == WHITE else 24 <= to < 32) \
+                and squares[s - forward] == us_bit | PAWN:
+            origins.append(s - forward)
+    knight = us_bit | KNIGHT
+    for s in KNIGHT_ATTACKS[to]:
+        if squares[s] == knight:
+            origins.append(s)
+    queen = us_bit | QUEEN
+    for rays, slider in ((ROOK_RAYS, us_bit | ROOK), (BISHOP_RAYS, us_bit | BISHOP)):
+        for ray in rays[to]:
+            for s in ray:
+                piece = squares[s]
+                if piece:
+                    if piece == slider or piece == queen:
+                        origins.append(s)
+                    break
+    return origins
+
+def generate_evasions(pos, checkers, pinned, moves):
+    """
+    Legal moves out of check: king steps to safe squares, then (single
+    check only) captures of the checker and interpositions on its ray.
+    """
+    squares = pos.squares
+    us = pos.side
+    them = us ^ 1
+    ksq = pos.kings[us]
+    king = squares[ksq]
+    # Lift the king so sliders see through its current square
+    squares[ksq] = EMPTY
+    for to in KING_ATTACKS[ksq]:
+        target = squares[to]
+        if (not target or (target >> 3) == them) and not pos.attacked(to, them):
+            moves.append(ksq | (to << 6))
+    squares[ksq] = king
+    if len(checkers) > 1:
+        return
+
+    checker_sq, block = checkers[0]
+    for to in block:
+        promote = to < 8 or to >= 56
+        for frm in _origins_to(pos, to, to == checker_sq):
+            line = pinned.get(frm)
+            if line is not None and to not in line:
+                continue
+            if promote and squares[frm] & 7 == PAWN:
+                _add_pawn_moves(moves, frm, to, True, True)
+            else:
+                moves.append(frm | (to << 6))
+    # A checking pawn that just double-pushed can also be taken en passant
+    if pos.ep >= 0 and squares[checker_sq] & 7 == PAWN \
+            and checker_sq == (pos.ep + 8 if us == WHITE else pos.ep - 8):
+        pawn = (us << 3) | PAWN
+        for frm in PAWN_ATTACKS[them][pos.ep]:
+            if squares[frm] == pawn:
+                move = frm | (pos.ep << 6)
+                if pos.is_legal(move):
+                    moves.append(move)
+
+
+# Memory budget shared by every cache the engine keeps between moves
+MEMORY_BUDGET_MB = 64
+MEMORY_SPLIT = {'tt': 0.70, 'pawn': 0.10, 'eval': 0.10, 'mate': 0.10}
+PROOF_NODE_BYTES = 160
+
+class HashTable(object):
+    """
+    Fixed-size table of (key, value) pairs stored as two 64-bit words per
+    slot in one array('Q'), so entries cost no Python objects.
+    """
+
+    VALUE_OFFSET = 1 << 62
+
+    def __init__(self, name, size_bytes):
+        slots = 1 << max(8, (size_bytes // 16).bit_length() - 1)
+        self.name = name
+        self.mask = slots - 1
+        self.data = array('Q', [0]) * (2 * slots)
+        self.probes = self.hits = self.stores = 0
+
+    @property
+    def slots(self):
+        return self.mask + 1
+
+    @property
+    def nbytes(self):
+        return len(self.data) * self.data.itemsize
+
+    def clear(self):
+        # Drop the old words first so the table never exists twice at once
+        size = len(self.data)
+        self.data = None
+        self.data = array('Q', [0]) * size
+
+    def get(self, key):
+        """Signed value stored for `key`, or None"""
+        self.probes += 1
+        i = (key & self.mask) << 1
+        # Stored values are offset, so a zero value word marks an empty slot
+        # even for key 0 (the pawn key of a pawnless position)
+        value = self.data[i + 1]
+        if value and self.data[i] == key:
+            self.hits += 1
+            return value - self.VALUE_OFFSET
+        return None
+
+    def put(self, key, value):
+        self.stores += 1
+        i = (key & self.mask) << 1
+        self.data[i] = key
+        self.data[i + 1] = value + self.VALUE_OFFSET
+
+    def fill(self, sample=4096):
+        """Fraction of used slots, estimated from the first `sample` slots"""
+        n = min(sample, self.slots)
+        return sum(1 for i in range(0, 2 * n, 2) if self.data[i]) / float(n)
+
+
+# Transposition table data word: move 16 | score 18 | depth 8 | bound 2 | age 6
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2
+TT_SCORE_OFFSET = 1 << 17
+
+class TranspositionTable(HashTable):
+    """Depth-preferred replacement within a search, always-replace across searches"""
+
+    def __init__(self, size_bytes):
+        HashTable.__init__(self, 'tt', size_bytes)
+        self.age = 0
+
+    def new_search(self):
+        self.age = (self.age + 1) & 63
+
+    def probe(self, key):
+        """(depth, score, bound, move) for `key`, or None"""
+        self.probes += 1
+        i = (key & self.mask) << 1
+        data = self.data
+        if data[i] != key:
+            return None
+        self.hits += 1
+        word = data[i + 1]
+        return ((word >> 34) & 255, ((word >> 16) & 0x3ffff) - TT_SCORE_OFFSET,
+                (word >> 42) & 3, word & 0xffff)
+
+    def store(self, key, depth, score, bound, move):
+        i = (key & self.mask) << 1
+        data = self.data
+        old_key = data[i]
+        if old_key and old_key != key:
+            old = data[i + 1]
+            if (old >> 44) & 63 == self.age and (old >> 34) & 255 > depth:
+                return
+        elif old_key == key and not move:
+            move = data[i + 1] & 0xffff
+        self.stores += 1
+        data[i] = key
+        data[i + 1] = (move | (score + TT_SCORE_OFFSET) << 16 | min(max(depth, 0), 255) << 34
+                       | bound << 42 | self.age << 44)
+
+
+class EngineTables(object):
+    """All persistent caches, sized from one memory budget"""
+
+    def __init__(self, budget_mb=None):
+        self.budget_mb = budget_mb or MEMORY_BUDGET_MB
+        budget = self.budget_mb * 1024 * 1024
+        split = dict(MEMORY_SPLIT)
+        if EVALUATOR != 'nnue':
+            # Only network scores are cached; without one the TT gets that share
+            split['tt'] += split.pop('eval')
+        # Rounded, so 0.7 + 0.1 of the budget is not a float just under 0.8
+        size = dict((name, int(round(budget * share))) for name, share in split.items())
+        self.tt = TranspositionTable(size['tt'])
+        self.pawn = HashTable('pawn', size['pawn'])
+        self.eval = HashTable('eval', size['eval']) if 'eval' in size else None
+        self.mate_nodes = size['mate'] // PROOF_NODE_BYTES
+
+    def report(self):
+        """One line per cache: size, fill and hit rate"""
+        lines = []
+        total = 0
+        for table in (self.tt, self.pawn, self.eval):
+            if table is None:
+                continue
+            total += table.nbytes
+            lines.append('%-4s %6.1f MB %8d slots  fill %5.1f%%  probes %9d  hits %5.1f%%' % (
+                table.name, table.nbytes / 1048576.0, table.slots, 100 * table.fill(),
+                table.probes, 100.0 * table.hits / max(table.probes, 1)))
+        mate_bytes = self.mate_nodes * PROOF_NODE_BYTES
+        lines.append('mate %6.1f MB %8d nodes (proof-number solver cap)' % (
+            mate_bytes / 1048576.0, self.mate_nodes))
+        lines.append('total %5.1f MB of %d MB budget' % ((total + mate_bytes) / 1048576.0,
+                                                         self.budget_mb))
+        return '\n'.join(lines)
+
+_tables = None
+# Held while the caches or the network are being created, so the first move
+# waits for a warm-up in progress instead of allocating a second copy
+_init_lock = threading.RLock()
+
+def get_tables():
+    """Engine tables, allocated on first use"""
+    global _tables
+    if _tables is None:
+        with _init_lock:
+            if _tables is None:
+                _tables = EngineTables()
+    return _tables
+
+def configure_memory(budget_mb):
+    """Reallocate every cache for a new budget"""
+    global _tables
+    with _init_lock:
+        _tables = EngineTables(budget_mb)
+    return _tables
+
+def memory_report():
+    return get_tables().report()
+
+
+# Pawn structure, packed like PSQ and cached by pawn key
+DOUBLED_PAWN = pack_score(-10, -20)
+ISOLATED_PAWN = pack_score(-10, -15)
+PASSED_PAWN = [pack_score(mg, eg) for mg, eg in
+               ((0, 0), (5, 10), (10, 20), (15, 35), (25, 60), (40, 90), (60, 130), (0, 0))]
+
+def evaluate_pawns(squares):
+    """Doubled, isolated and passed pawns, packed, from white's view"""
+    files = ([0] * 8, [0] * 8)
+    pawns = ([], [])
+    for sq in range(8, 56):
+        piece = squares[sq]
+        if piece & 7 == PAWN:
+            colour = piece >> 3
+            files[colour][sq & 7] += 1
+            pawns[colour].append(sq)
+    score = 0
+    for colour, sign in ((WHITE, 1), (BLACK, -1)):
+        own, enemy = files[colour], files[colour ^ 1]
+        enemy_pawn = PAWN | ((colour ^ 1) << 3)
+        for file in range(8):
+            if own[file] > 1:
+                score += sign * DOUBLED_PAWN * (own[file] - 1)
+            if own[file] and (file == 0 or not own[file - 1]) and (file == 7 or not own[file + 1]):
+                score += sign * ISOLATED_PAWN * own[file]
+        for sq in pawns[colour]:
+            file = sq & 7
+            passed = True
+            for f in (file - 1, file, file + 1):
+                if 0 <= f < 8 and enemy[f]:
+                    ahead = range(sq - 8 + f - file, -1, -8) if colour == WHITE \
+                        else range(sq + 8 + f - file, 64, 8)
+                    for s in ahead:
+                        if squares[s] == enemy_pawn:
+                            passed = False
+                            break
+                if not passed:
+                    break
+            if passed:
+                rank = 7 - (sq >> 3) if colour == WHITE else sq >> 3
+                score += sign * PASSED_PAWN[rank]
+    return score
+
+def evaluate_position(pos):
+    """
+    Tapered evaluation from white's view.
+
+    The packed middlegame/endgame sum and the phase are kept up to date by
+    make/unmake and the pawn term comes from the pawn hash, so this is
+    normally a probe and a single interpolation.
+    """
+    pawn_hash = get_tables().pawn
+    pawns = pawn_hash.get(pos.pawn_key)
+    if pawns is None:
+        pawns = evaluate_pawns(pos.squares)
+        pawn_hash.put(pos.pawn_key, pawns)
+    packed = pos.psq + pawns
+    eg = (packed + 0x8000) >> 16
+    mg = packed - (eg << 16)
+    phase = pos.phase if pos.phase < PHASE_MAX else PHASE_MAX
+    return (mg * phase + eg * (PHASE_MAX - phase)) // PHASE_MAX
+
+
+# Optional NNUE evaluator: 768 piece-square inputs per perspective, one
+# hidden layer with clipped ReLU, quantised weights in a small binary file
+EVALUATOR = 'classic'
+_here = os.path.dirname(os.path.abspath(globals().get('__file__', 'main_v13.py')))
+NNUE_FILE = os.path.join(_here, 'main_v13.nnue')
+NNUE_MAGIC = b'NNU1'
+NNUE_FEATURES = 768
+NNUE_QA = 255
+NNUE_QB = 64
+
+class NnueNetwork(object):
+    """Quantised weights, with the first layer laid out per (piece, square)"""
+
+    def __init__(self, w1, b1, w2, b2, scale=400):
+        hidden = b1.shape[0]
+        self.hidden = hidden
+        self.b1 = b1.astype(np.int32)
+        self.w2_us = w2[:hidden].astype(np.int32)
+        self.w2_them = w2[hidden:].astype(np.int32)
+        self.b2 = int(b2)
+        self.scale = scale
+        # rows[piece, sq] holds the white- and black-perspective rows together
+        w1 = w1.astype(np.int32)
+        rows = np.zeros((15, 64, 2, hidden), dtype=np.int32)
+        for piece in range(15):
+            if piece & 7 == 0 or piece & 7 == 7:
+                continue
+            for sq in range(64):
+                rows[piece, sq, 0] = w1[nnue_feature(piece, sq, WHITE)]
+                rows[piece, sq, 1] = w1[nnue_feature(piece, sq, BLACK)]
+        self.rows = rows
+
+def nnue_feature(piece, sq, perspective):
+    """Input index of a piece seen from one side (own pieces first, mirrored for black)"""
+    relative = (piece >> 3) ^ perspective
+    return ((relative * 6 + (piece & 7) - 1) << 6) | (sq ^ (56 * perspective))
+
+def save_nnue(path, w1, b1, w2, b2, scale=400):
+    """Write weights: header, int16 W1 and b1, int8 W2, int32 b2"""
+    import_numpy()
+    hidden = b1.shape[0]
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<4sII', NNUE_MAGIC, hidden, scale))
+        f.write(np.ascontiguousarray(w1, dtype='<i2').tobytes())
+        f.write(np.ascontiguousarray(b1, dtype='<i2').tobytes())
+        f.write(np.ascontiguousarray(w2, dtype='<i1').tobytes())
+        f.write(struct.pack('<i', int(b2)))
+
+def load_nnue(path):
+    import_numpy()
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, hidden, scale = struct.unpack_from('<4sII', data, 0)
+    if magic != NNUE_MAGIC:
+        raise ValueError('not an NNUE weights file: %s' % path)
+    offset = 12
+    w1 = np.frombuffer(data, '<i2', NNUE_FEATURES * hidden, offset).reshape(NNUE_FEATURES, hidden)
+    offset += w1.nbytes
+    b1 = np.frombuffer(data, '<i2', hidden, offset)
+    offset += b1.nbytes
+    w2 = np.frombuffer(data, '<i1', 2 * hidden, offset)
+    offset += w2.nbytes
+    b2, = struct.unpack_from('<i', data, offset)
+    return NnueNetwork(w1, b1, w2, b2, scale)
+
+_nnue_network = None
+
+def get_nnue_network():
+    """Load NNUE_FILE once; None when NumPy or the file is missing"""
+    global _nnue_network
+    if _nnue_network is None and os.path.exists(NNUE_FILE):
+        with _init_lock:
+            if _nnue_network is None and import_numpy() is not None:
+                _nnue_network = load_nnue(NNUE_FILE)
+    return _nnue_network
+
+
+class NnuePosition(Position):
+    """
+    Position evaluated by an NNUE network.
+
+    The first-layer accumulator (both perspectives) is updated from the
+    pieces a move adds and removes, and the previous one is kept on a stack
+    so unmake_move is a pop.
+    """
+
+    def __init__(self, fen, network):
+        self.network = network
+        Position.__init__(self, fen)
+
+    def set_fen(self, fen):
+        Position.set_fen(self, fen)
+        self.accumulators = [self.refresh_accumulator()]
+
+    def refresh_accumulator(self):
+        rows = self.network.rows
+        acc = np.empty((2, self.network.hidden), dtype=np.int32)
+        acc[:] = self.network.b1
+        for sq, piece in enumerate(self.squares):
+            if piece:
+                acc += rows[piece, sq]
+        return acc
+
+    def make_move(self, move):
+        squares = self.squares
+        frm, to, promo = move & 63, (move >> 6) & 63, move >> 12
+        piece = squares[frm]
+        captured = squares[to]
+        rows = self.network.rows
+        acc = self.accumulators[-1] - rows[piece, frm]
+        if captured:
+            acc -= rows[captured, to]
+        ptype = piece & 7
+        if ptype == PAWN and to == self.ep:
+            cap_sq = to + 8 if self.side == WHITE else to - 8
+            acc -= rows[squares[cap_sq], cap_sq]
+        elif ptype == KING and (to - frm == 2 or frm - to == 2):
+            rook_from, rook_to = CASTLE_ROOK[to]
+            acc += rows[squares[rook_from], rook_to] - rows[squares[rook_from], rook_from]
+        acc += rows[promo | (self.side << 3) if promo else piece, to]
+        self.accumulators.append(acc)
+        Position.make_move(self, move)
+
+    def unmake_move(self):
+        Position.unmake_move(self)
+        self.accumulators.pop()
+
+    def evaluate(self):
+        # Network evaluations are costly enough to be worth caching; tables
+        # allocated while EVALUATOR was 'classic' have no cache for them
+        eval_cache = get_tables().eval
+        if eval_cache is not None:
+            cached = eval_cache.get(self.key)
+            if cached is not None:
+                return cached
+        network = self.network
+        acc = self.accumulators[-1]
+        us = self.side
+        hidden_us = np.clip(acc[us], 0, NNUE_QA)
+        hidden_them = np.clip(acc[us ^ 1], 0, NNUE_QA)
+        out = int(hidden_us.dot(network.w2_us)) + int(hidden_them.dot(network.w2_them)) + network.b2
+        score = out * network.scale // (NNUE_QA * NNUE_QB)
+        score = score if us == WHITE else -score
+        if eval_cache is not None:
+            eval_cache.put(self.key, score)
+        return score
+
+def new_position(fen, evaluator=None):
+    """Position for the chosen evaluator, falling back to the classic one"""
+    if (evaluator or EVALUATOR) == 'nnue':
+        network = get_nnue_network()
+        if network is not None:
+            return NnuePosition(fen, network)
+    return Position(fen)
+
+
+def find_mate_in_one(pos, moves=None):
+    """Play out only the checking moves and return one that mates, or 0"""
+    if moves is None:
+        moves = pos.legal_moves()
+    check_info = pos.check_squares()
+    for move in moves:
+        if pos.gives_check(move, check_info):
+            pos.make_move(move)
+            mate = not pos.has_legal_move()
+            pos.unmake_move()
+            if mate:
+                return move
+    return 0
+
+
+SEE_VALUES = [0, 100, 320, 330, 500, 900, 20000]
+
+def least_valuable_attacker(squares, sq, side):
+    """
+    Square of the cheapest `side` piece attacking `sq`, or -1.
+
+    Works on the live board, so pieces already removed by the exchange
+    uncover the sliders behind them (x-ray attackers).
+    """
+    side_bit = side << 3
+    pawn = side_bit | PAWN
+    for s in PAWN_ATTACKS[side ^ 1][sq]:
+        if squares[s] == pawn:
+            return s
+    knight = side_bit | KNIGHT
+    for s in KNIGHT_ATTACKS[sq]:
+        if squares[s] == knight:
+            return s
+    best, best_type = -1, 7
+    for rays, slider in ((BISHOP_RAYS, BISHOP), (ROOK_RAYS, ROOK)):
+        for ray in rays[sq]:
+            for s in ray:
+                piece = squares[s]
+                if piece:
+                    ptype = piece & 7
+                    if (piece & 8) == side_bit and (ptype == slider or ptype == QUEEN) \
+                            and ptype < best_type:
+                        best, best_type = s, ptype
+                    break
+        if best_type == BISHOP:
+            return best
+    if best >= 0:
+        return best
+    king = side_bit | KING
+    for s in KING_ATTACKS[sq]:
+        if squares[s] == king:
+            return s
+    return -1
+
+def see(pos, move):
+    """Static exchange evaluation of a capture, in centipawns for the mover"""
+    squares = pos.squares
+    frm, to, promo = move & 63, (move >> 6) & 63, move >> 12
+    piece = squares[frm]
+    removed = [(frm, piece)]
+    if squares[to]:
+        gain = [SEE_VALUES[squares[to] & 7]]
+    elif piece & 7 == PAWN and to == pos.ep:
+        cap_sq = to + 8 if pos.side == WHITE else to - 8
+        removed.append((cap_sq, squares[cap_sq]))
+        squares[cap_sq] = EMPTY
+        gain = [SEE_VALUES[PAWN]]
+    else:
+        gain = [0]
+    on_square = SEE_VALUES[piece & 7]
+    if promo:
+        gain[0] += SEE_VALUES[promo] - SEE_VALUES[PAWN]
+        on_square = SEE_VALUES[promo]
+    squares[frm] = EMPTY
+
+    side = pos.side ^ 1
+    while True:
+        sq = least_valuable_attacker(squares, to, side)
+        if sq < 0:
+            break
+        gain.append(on_square - gain[-1])
+        on_square = SEE_VALUES[squares[sq] & 7]
+        removed.append((sq, squares[sq]))
+        squares[sq] = EMPTY
+        side ^= 1
+
+    for sq, piece in removed:
+        squares[sq] = piece
+    while len(gain) > 1:
+        last = gain.pop()
+        gain[-1] = -max(-gain[-1], last)
+    return gain[0]
+
+
+# Proof-number search over checks and evasions
+PN_INF = 1 << 30
+
+class ProofNode(object):
+    """One node of the proof-number tree; OR nodes are the attacker's"""
+    __slots__ = ('move', 'parent', 'children', 'pn', 'dn', 'or_node', 'moves_left')
+
+    def __init__(self, move, parent, or_node, moves_left):
+        self.move = move
+        self.parent = parent
+        self.children = None
+        self.pn = 1
+        self.dn = 1
+        self.or_node = or_node
+        self.moves_left = moves_left
+
+def _pn_expand(pos, node):
+    """Create the children of a leaf, or solve it; returns nodes added"""
+    if node.or_node:
+        if node.moves_left == 0:
+            node.pn, node.dn = PN_INF, 0
+            return 0
+        moves = pos.legal_moves()
+        check_info = pos.check_squares()
+        checks = [m for m in moves if pos.gives_check(m, check_info)]
+        if not checks:
+            node.pn, node.dn = PN_INF, 0
+            return 0
+        node.children = [ProofNode(m, node, False, node.moves_left - 1) for m in checks]
+    else:
+        if node.moves_left == 0:
+            # Out of attacking moves: only an immediate mate counts
+            if pos.has_legal_move():
+                node.pn, node.dn = PN_INF, 0
+            else:
+                node.pn, node.dn = 0, PN_INF
+            return 0
+        moves = pos.legal_moves()
+        if not moves:
+            node.pn, node.dn = 0, PN_INF
+            return 0
+        node.children = [ProofNode(m, node, True, node.moves_left) for m in moves]
+    _pn_set_numbers(node)
+    return len(node.children)
+
+def _pn_set_numbers(node):
+    children = node.children
+    if node.or_node:
+        node.pn = min(c.pn for c in children)
+        node.dn = min(sum(c.dn for c in children), PN_INF)
+    else:
+        node.pn = min(sum(c.pn for c in children), PN_INF)
+        node.dn = min(c.dn for c in children)
+
+def _pn_release(node):
+    """Drop the subtree below a solved node; returns nodes freed"""
+    freed = 0
+    stack = [node]
+    while stack:
+        children = stack.pop().children
+        if children:
+            freed += len(children)
+            stack.extend(children)
+    node.children = None
+    return freed
+
+def prove_mate(pos, max_moves=3, max_nodes=20000, max_stored=None, max_time=0.1):
+    """
+    Proof-number search for a forced mate in at most `max_moves` moves.
+
+    The attacker only considers checking moves, the defender all evasions,
+    so the tree stays narrow. `max_nodes` bounds expansions, `max_stored`
+    the number of tree nodes held at once (solved subtrees are freed;
+    defaults to the solver's share of the memory budget), and
+    `max_time` the wall clock. Returns (mating move or 0, expansions).
+    """
+    if max_stored is None:
+        max_stored = get_tables().mate_nodes
+    start_time = time.time()
+    root = ProofNode(0, None, True, max_moves)
+    stored = 1
+    expansions = 0
+    while root.pn and root.dn and expansions < max_nodes and stored < max_stored:
+        if expansions & 31 == 0 and time.time() - start_time > max_time:
+            break
+        # Descend to the most-proving leaf
+        node = root
+        while node.children:
+            if node.or_node:
+                node = min(node.children, key=lambda c: c.pn)
+            else:
+                node = min(node.children, key=lambda c: c.dn)
+            pos.make_move(node.move)
+        stored += _pn_expand(pos, node)
+        expansions += 1
+        # Back the new numbers up to the root, undoing moves on the way
+        while node is not root:
+            if node.children:
+                _pn_set_numbers(node)
+            if (node.pn == 0 or node.dn == 0) and node.children:
+                stored -= _pn_release(node)
+            pos.unmake_move()
+            node = node.parent
+        if root.children:
+            _pn_set_numbers(root)
+
+    if root.pn == 0 and root.children:
+        for child in root.children:
+            if child.pn == 0:
+                return child.move, expansions
+    return 0, expansions
+
+
+class SearchInfo(object):
+    """Limits, counters and move-ordering tables shared by one search"""
+
+    def __init__(self, max_time=0.95, max_depth=64, max_nodes=None):
+        self.start_time = time.time()
+        self.max_time = max_time
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        # Called as on_iteration(depth, score, move) after each finished depth
+        self.on_iteration = None
+        self.nodes = 0
+        self.movegen_calls = 0
+        self.quiet_gens = 0
+        self.qnodes = 0
+        self.see_pruned = 0
+        self.futility_pruned = 0
+        self.reverse_futility_cuts = 0
+        self.razor_cuts = 0
+        self.probcut_tries = 0
+        self.probcut_cuts = 0
+        self.multicut_tries = 0
+        self.multicut_cuts = 0
+        self.stopped = False
+        self.tt = get_tables().tt
+        self.tt.new_search()
+        self.killers = [[0, 0] for _ in range(128)]
+        self.history = [0] * 4096
+
+    def check_time(self):
+        """Polled every 1024 nodes; also enforces the node limit"""
+        if time.time() - self.start_time > self.max_time \
+                or (self.max_nodes is not None and self.nodes >= self.max_nodes):
+            self.stopped = True
+        return self.stopped
+
+
+def score_to_tt(score, ply):
+    """Store mate scores relative to the node, not the root"""
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+def score_from_tt(score, ply):
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+def pick_moves(pos, tt_move, ply, info):
+    """
+    Staged legal move picker: hash move, captures (MVV-LVA), killers, quiets.
+
+    Each stage is generated only when the previous one ran out, so a beta
+    cutoff on the hash move or a capture skips quiet move generation.
+    Legality comes from the pin map built once per node; in check, the
+    evasion generator replaces the stages.
+    """
+    squares = pos.squares
+    checkers, pinned = pos.checks_and_pins()
+    if checkers:
+        moves = []
+        generate_evasions(pos, checkers, pinned, moves)
+        info.movegen_calls += 1
+        moves.sort(key=lambda m: (m == tt_move, squares[(m >> 6) & 63] & 7), reverse=True)
+        for move in moves:
+            yield move
+        return
+
+    legal = pos.is_legal_unchecked
+    if tt_move and pos.is_pseudo_legal(tt_move) and legal(tt_move, pinned):
+        yield tt_move
+
+    moves = []
+    generate_captures(pos, moves)
+    info.movegen_calls += 1
+    scored = []
+    bad_captures = []
+    for move in moves:
+        if move == tt_move:
+            continue
+        victim = squares[(move >> 6) & 63] & 7
+        attacker = squares[move & 63] & 7
+        # Only captures of a cheaper piece can lose material
+        if SEE_VALUES[victim] < SEE_VALUES[attacker] and see(pos, move) < 0:
+            bad_captures.append(move)
+        else:
+            scored.append((victim * 8 - attacker + ((move >> 12) << 4), move))
+    scored.sort(reverse=True)
+    for _, move in scored:
+        if legal(move, pinned):
+            yield move
+
+    # Only killers actually tried here are skipped among the quiets below
+    killer_1 = killer_2 = 0
+    for killer in info.killers[ply]:
+        to = (killer >> 6) & 63
+        # A pawn onto the en-passant square is a capture, already tried above
+        if killer and killer != tt_move and not squares[to] \
+                and (to != pos.ep or squares[killer & 63] & 7 != PAWN) \
+                and pos.is_pseudo_legal(killer) and legal(killer, pinned):
+            if killer_1:
+                killer_2 = killer
+            else:
+                killer_1 = killer
+            yield killer
+
+    moves = []
+    generate_quiets(pos, moves)
+    info.movegen_calls += 1
+    info.quiet_gens += 1
+    history = info.history
+    moves.sort(key=lambda m: history[m & 4095], reverse=True)
+    for move in moves:
+        if move != tt_move and move != killer_1 and move != killer_2 \
+                and legal(move, pinned):
+            yield move
+
+    # Captures that lose material by SEE go last
+    for move in bad_captures:
+        if legal(move, pinned):
+            yield move
+
+def quiesce(pos, alpha, beta, ply, info):
+    """Capture-only search; captures losing material by SEE are skipped"""
+    info.nodes += 1
+    info.qnodes += 1
+    if info.nodes & 1023 == 0 and info.check_time():
+        return 0
+    if info.stopped:
+        return 0
+
+    checkers, pinned = pos.checks_and_pins()
+    squares = pos.squares
+    if checkers:
+        # No standing pat in check: every evasion is tried
+        moves = []
+        generate_evasions(pos, checkers, pinned, moves)
+        if not moves:
+            return -MATE_SCORE + ply
+        best_score = -MATE_SCORE - 1
+    else:
+        score = pos.evaluate()
+        best_score = score if pos.side == WHITE else -score
+        if best_score >= beta or ply >= 64:
+            return best_score
+        if best_score > alpha:
+            alpha = best_score
+        moves = []
+        generate_captures(pos, moves)
+        moves = [m for m in moves if pos.is_legal_unchecked(m, pinned)]
+    moves.sort(key=lambda m: (squares[(m >> 6) & 63] & 7) * 8 - (squares[m & 63] & 7)
+               + ((m >> 12) << 4), reverse=True)
+
+    for move in moves:
+        if not checkers:
+            victim = squares[(move >> 6) & 63] & 7
+            if SEE_VALUES[victim] < SEE_VALUES[squares[move & 63] & 7] and see(pos, move) < 0:
+                info.see_pruned += 1
+                continue
+        pos.make_move(move)
+        score = -quiesce(pos, -beta, -alpha, ply + 1, info)
+        pos.unmake_move()
+        if info.stopped:
+            return 0
+        if score > best_score:
+            best_score = score
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+    return best_score
+
+# Cut nodes early when a reversible move can repeat a position on the path
+CUCKOO_CYCLES = True
+
+# Frontier pruning margins, indexed by remaining depth (entry 0 unused);
+# a shorter tuple switches the technique off beyond its length, () entirely.
+# Quiet moves are skipped when the static eval plus the margin cannot reach
+# alpha (futility); a node whose static eval beats beta by the margin is
+# cut (reverse futility); one far below alpha is checked with quiescence
+# only (razoring). None of them apply in check or near mate scores.
+FUTILITY_MARGINS = (0, 200, 400)
+REVERSE_FUTILITY_MARGINS = (0, 120, 240, 360)
+RAZOR_MARGINS = (0, 300, 550)
+
+# Selective pruning at deeper nodes. ProbCut plays captures that win enough
+# by SEE and cuts when a search PROBCUT_REDUCTION plies shallower still
+# beats beta + PROBCUT_MARGIN. Multi-cut, at nodes the hash table expects
+# to fail high, cuts when MULTICUT_REQUIRED of the first MULTICUT_MOVES
+# moves fail high at MULTICUT_REDUCTION extra plies of reduction.
+PROBCUT = True
+PROBCUT_MIN_DEPTH = 4
+PROBCUT_REDUCTION = 3
+PROBCUT_MARGIN = 200
+MULTICUT = True
+MULTICUT_MIN_DEPTH = 4
+MULTICUT_REDUCTION = 2
+MULTICUT_MOVES = 6
+MULTICUT_REQUIRED = 3
+
+def probcut(pos, depth, beta, static_eval, ply, info):
+    """Score of a capture proving the node will fail high, or None"""
+    raised = beta + PROBCUT_MARGIN
+    checkers, pinned = pos.checks_and_pins()
+    squares = pos.squares
+    moves = []
+    generate_captures(pos, moves)
+    moves.sort(key=lambda m: (squares[(m >> 6) & 63] & 7) * 8 - (squares[m & 63] & 7),
+               reverse=True)
+    for move in moves:
+        if see(pos, move) < raised - static_eval or not pos.is_legal_unchecked(move, pinned):
+            continue
+        info.probcut_tries += 1
+        pos.make_move(move)
+        # Quiescence first: most captures that fail there fail the search too
+        score = -quiesce(pos, -raised, -raised + 1, ply + 1, info)
+        if score >= raised:
+            _, score = alpha_beta(pos, depth - PROBCUT_REDUCTION, -raised, -raised + 1, ply + 1, info)
+            score = -score
+        pos.unmake_move()
+        if info.stopped:
+            return None
+        if score >= raised:
+            info.probcut_cuts += 1
+            return score
+    return None
+
+def multicut(pos, depth, beta, tt_move, ply, info):
+    """True when enough of the first moves fail high at reduced depth"""
+    info.multicut_tries += 1
+    cuts = tried = 0
+    for move in pick_moves(pos, tt_move, ply, info):
+        pos.make_move(move)
+        _, score = alpha_beta(pos, depth - 1 - MULTICUT_REDUCTION, -beta, -beta + 1, ply + 1, info)
+        pos.unmake_move()
+        if info.stopped:
+            return False
+        if -score >= beta:
+            cuts += 1
+            if cuts >= MULTICUT_REQUIRED:
+                info.multicut_cuts += 1
+                return True
+        tried += 1
+        if tried >= MULTICUT_MOVES:
+            break
+    return False
+
+def alpha_beta(pos, depth, alpha, beta, ply, info):
+    """Negamax alpha-beta; scores are from the side to move's point of view"""
+    info.nodes += 1
+    if info.nodes & 1023 == 0 and info.check_time():
+        return None, 0
+    if info.stopped:
+        return None, 0
+
+    if ply > 0:
+        if pos.is_draw(ply):
+            return None, 0
+        # A move back to a position on the path means we can at least draw
+        if CUCKOO_CYCLES and alpha < 0 and pos.has_game_cycle(ply):
+            alpha = 0
+            if alpha >= beta:
+                return None, alpha
+
+    if depth <= 0:
+        info.nodes -= 1
+        return None, quiesce(pos, alpha, beta, ply, info)
+
+    tt_move = 0
+    expected_cut = False
+    entry = info.tt.probe(pos.key)
+    if entry is not None:
+        tt_depth, tt_score, tt_bound, tt_move = entry
+        tt_score = score_from_tt(tt_score, ply)
+        if ply > 0 and tt_depth >= depth:
+            if tt_bound == TT_EXACT or (tt_bound == TT_LOWER and tt_score >= beta) \
+                    or (tt_bound == TT_UPPER and tt_score <= alpha):
+                return tt_move, tt_score
+        expected_cut = tt_bound == TT_LOWER and tt_score >= beta
+
+    futile = False
+    if ply > 0 and not pos.in_check():
+        score = pos.evaluate()
+        static_eval = score if pos.side == WHITE else -score
+        if depth < len(REVERSE_FUTILITY_MARGINS) and abs(beta) < MATE_BOUND \
+                and static_eval - REVERSE_FUTILITY_MARGINS[depth] >= beta:
+            info.reverse_futility_cuts += 1
+            return None, static_eval - REVERSE_FUTILITY_MARGINS[depth]
+        if abs(alpha) < MATE_BOUND:
+            if depth < len(RAZOR_MARGINS) and static_eval + RAZOR_MARGINS[depth] <= alpha:
+                info.nodes -= 1
+                score = quiesce(pos, alpha, alpha + 1, ply, info)
+                if score <= alpha:
+                    info.razor_cuts += 1
+                    return None, score
+                info.nodes += 1
+            futile = depth < len(FUTILITY_MARGINS) and static_eval + FUTILITY_MARGINS[depth] <= alpha
+        if abs(beta) < MATE_BOUND:
+            if PROBCUT and depth >= PROBCUT_MIN_DEPTH:
+                score = probcut(pos, depth, beta, static_eval, ply, info)
+                if info.stopped:
+                    return None, 0
+                if score is not None:
+                    return None, score
+            if MULTICUT and depth >= MULTICUT_MIN_DEPTH and expected_cut:
+                if multicut(pos, depth, beta, tt_move, ply, info):
+                    return tt_move, beta
+                if info.stopped:
+                    return None, 0
+    if futile:
+        check_info = pos.check_squares()
+
+    squares = pos.squares
+    alpha_orig = alpha
+    best_move, best_score = 0, -MATE_SCORE - 1
+    searched = 0
+    for move in pick_moves(pos, tt_move, ply, info):
+        quiet = not squares[(move >> 6) & 63] and not move >> 12 and (move >> 6) & 63 != pos.ep
+        # At least one move is always searched, so mates are still found
+        if futile and quiet and searched and not pos.gives_check(move, check_info):
+            info.futility_pruned += 1
+            continue
+        pos.make_move(move)
+        searched += 1
+        _, score = alpha_beta(pos, depth - 1, -beta, -alpha, ply + 1, info)
+        score = -score
+        pos.unmake_move()
+        if info.stopped:
+            return best_move or move, best_score
+        if score > best_score:
+            best_score, best_move = score, move
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    if quiet:
+                        killers = info.killers[ply]
+                        if killers[0] != move:
+                            killers[1] = killers[0]
+                            killers[0] = move
+                        info.history[move & 4095] += depth * depth
+                    break
+
+    if not searched:
+        # Mate or stalemate is only decided here, where no move is left
+        if pos.in_check():
+            return None, -MATE_SCORE + ply
+        return None, 0
+
+    if best_score >= beta:
+        bound = TT_LOWER
+    elif best_score > alpha_orig:
+        bound = TT_EXACT
+    else:
+        bound = TT_UPPER
+    info.tt.store(pos.key, depth, score_to_tt(best_score, ply), bound, best_move)
+    return best_move, best_score
+
+def search(pos, info):
+    """Iterative deepening; returns (best move, score, completed depth)"""
+    moves = pos.legal_moves()
+    if not moves:
+        return None, 0, 0
+    best_move, best_score, completed = moves[0], 0, 0
+    for depth in range(1, info.max_depth + 1):
+        move, score = alpha_beta(pos, depth, -MATE_SCORE - 1, MATE_SCORE + 1, 0, info)
+        if info.stopped:
+            break
+        best_move, best_score, completed = move, score, depth
+        if info.on_iteration is not None:
+            info.on_iteration(depth, score, move)
+        if abs(score) > MATE_BOUND:
+            break
+    return best_move, best_score, completed
+
+def principal_variation(pos, move, max_length=64):
+    """The root move followed by hash moves, as long as they stay legal"""
+    pv = []
+    seen = set()
+    while move and len(pv) < max_length and pos.key not in seen:
+        seen.add(pos.key)
+        if not pos.is_pseudo_legal(move) or not pos.is_legal(move):
+            break
+        pv.append(move)
+        pos.make_move(move)
+        entry = get_tables().tt.probe(pos.key)
+        move = entry[3] if entry is not None else 0
+    for _ in pv:
+        pos.unmake_move()
+    return pv
+
+# The game as seen by chess_bot, per side it plays (one process may play
+# both sides of a self-play game): keys before our last move and the
+# position it left the opponent, so the next observation can be linked to it
+_games = {}
+
+def game_history(pos):
+    """
+    Keys of the game positions before `pos`, back to the last irreversible
+    move. Kaggle only sends the current FEN, so the game is followed by
+    finding the opponent reply that leads from our last position to this
+    one; when there is none (a new game) the history starts again.
+    """
+    game = _games.get(pos.side)
+    if game is None or not pos.halfmove:
+        return []
+    last = game['position']
+    for move in last.legal_moves():
+        last.make_move(move)
+        found = last.key == pos.key
+        last.unmake_move()
+        if found:
+            return (game['keys'] + [last.key])[-pos.halfmove:]
+    return []
+
+def remember_move(pos, move):
+    """Record the position before and after our move for the next call"""
+    _games[pos.side] = {'keys': pos.history + [pos.key], 'position': pos}
+    pos.make_move(move)
+
+# Pondering: in long-running local play (arenas, UCI drivers calling
+# chess_bot) keep searching the expected reply on the opponent's time, so
+# the hash table is already filled when it is played. Off for Kaggle.
+# There is one ponder search per process: every call stops it first,
+# whichever side started it, and end_game() stops it when a game is over.
+PONDER = False
+PONDER_STATS = {'hits': 0, 'misses': 0, 'nodes': 0, 'depth': 0}
+_ponder = {'thread': None, 'info': None, 'key': None}
+
+def start_pondering(pos, reply):
+    """Search `pos` after `reply` in a background thread until stopped"""
+    ponder_pos = new_position(pos.fen)
+    ponder_pos.history = pos.game_keys()
+    ponder_pos.make_move(reply)
+    info = SearchInfo(max_time=float('inf'))
+    thread = threading.Thread(target=_ponder_search, args=(ponder_pos, info), name='ponder')
+    thread.daemon = True
+    _ponder.update(thread=thread, info=info, key=ponder_pos.key)
+    thread.start()
+
+def _ponder_search(pos, info):
+    _, _, depth = search(pos, info)
+    PONDER_STATS['depth'] = depth
+
+def stop_pondering(pos):
+    """Stop a ponder search; True when it was searching `pos` (a ponder hit, never for None)"""
+    thread = _ponder['thread']
+    if thread is None:
+        return False
+    _ponder['info'].stopped = True
+    thread.join()
+    hit = pos is not None and _ponder['key'] == pos.key
+    PONDER_STATS['hits' if hit else 'misses'] += 1
+    PONDER_STATS['nodes'] += _ponder['info'].nodes
+    _ponder.update(thread=None, info=None, key=None)
+    return hit
+
+def end_game():
+    """Stop pondering and forget the games followed so far"""
+    stop_pondering(None)
+    _games.clear()
+
+# Reproducible mode: with a fixed node or depth budget instead of the
+# clock, and the hash table cleared before each move, the same observations
+# give the same moves, scores and node counts on every run and host
+FIXED_NODES = None
+FIXED_DEPTH = None
+# What the last chess_bot call decided and how: move, score, depth, nodes
+LAST_SEARCH = {}
+# A move frees nearly everything it allocates, so collector passes during
+# it are pure latency; False pauses the collector until the move is returned
+GC_DURING_SEARCH = True
+
+def chess_bot(obs):
+    """Alpha-beta bot on a lazy-status position with make/unmake"""
+    call_start = time.perf_counter()
+    moves = None
+    gc_paused = not GC_DURING_SEARCH and gc.isenabled()
+    if gc_paused:
+        gc.disable()
+    try:
+        # EVALUATOR = 'nnue' switches to the network when it can be loaded
+        pos = new_position(obs.board)
+        pos.history = game_history(pos)
+        if PONDER:
+            # A hit leaves its search in the hash table for the search below
+            stop_pondering(pos)
+        moves = pos.legal_moves()
+        if not moves:
+            return None
+
+        fixed = FIXED_NODES is not None or FIXED_DEPTH is not None
+        if fixed:
+            get_tables().tt.clear()
+        LAST_SEARCH.clear()
+
+        # Every move is scanned; only checking moves are played out
+        best_move = find_mate_in_one(pos, moves)
+
+        # A small slice of the budget goes to proving a short forced mate
+        if not best_move:
+            best_move, _ = prove_mate(pos, max_moves=3,
+                                      max_time=float('inf') if fixed else 0.1)
+
+        if not best_move:
+            if fixed:
+                info = SearchInfo(max_time=float('inf'), max_depth=FIXED_DEPTH or 64,
+                                  max_nodes=FIXED_NODES)
+            else:
+                max_depth = 5 if pos.phase <= ENDGAME_PHASE else 4
+                # The 0.95 s budget covers the whole call, mate proving included
+                elapsed = time.perf_counter() - call_start
+                info = SearchInfo(max_time=max(0.95 - elapsed, 0.0), max_depth=max_depth)
+            best_move, score, depth = search(pos, info)
+            LAST_SEARCH.update(score=score, depth=depth, nodes=info.nodes)
+        LAST_SEARCH['move'] = move_to_uci(best_move)
+
+        pv = principal_variation(pos, best_move, 2) if PONDER else []
+        remember_move(pos, best_move)
+        if len(pv) > 1:
+            start_pondering(pos, pv[1])
+        return move_to_uci(best_move)
+
+    except Exception:
+        return move_to_uci(moves[0]) if moves else None
+
+    finally:
+        if gc_paused:
+            gc.enable()
+        if 'first_call' not in STARTUP:
+            STARTUP['first_call'] = time.perf_counter() - call_start
+
+# Allocating the caches, building the cuckoo tables and loading the network
+# take tens of milliseconds; doing it in a thread at import keeps it off the
+# first move whenever the caller imports ahead of time. Copies loaded only
+# for the move rules set CHESS_BOT_NO_WARMUP so they allocate no caches at all.
+WARMUP_IN_BACKGROUND = not os.environ.get('CHESS_BOT_NO_WARMUP')
+
+def warm_up():
+    start = time.perf_counter()
+    get_tables()
+    if EVALUATOR == 'nnue':
+        get_nnue_network()
+    if CUCKOO_CYCLES:
+        get_cuckoo()
+    STARTUP['warmup'] = time.perf_counter() - start
+
+STARTUP['import'] = time.perf_counter() - _import_start
+if WARMUP_IN_BACKGROUND:
+    _warmup_thread = threading.Thread(target=warm_up, name='warmup')
+    _warmup_thread.daemon = True
+    _warmup_thread.start()
@@ -0,0 +1,278 @@
+"""
+Asyncio arena: many concurrent bot-vs-bot games on a fixed set of worker
+processes.
+
+Every `chess_bot` call runs in a worker process, which times it; that time
+is charged to a Kaggle clock (a free allowance per move, then an overage
+bank for the game). The event loop enforces each move's deadline, with a
+little slack for scheduling. A worker that misses it is killed and replaced
+by a fresh one, so a hung bot loses on time instead of stalling the run;
+one that dies mid-move is replaced too and its bot forfeits the game.
+Finished games are appended to a JSON-lines file as they end.
+
+    python tools/arena.py v13 v12 --games 200 --concurrency 200 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botlib import call_seeded, load_bot, load_rules, make_obs
+from referee import ACT_TIMEOUT, OVERAGE_TIME, Clock, game_over
+
+MAX_PLIES = 400
+# Allowance for pool and event-loop latency on top of a move's deadline
+DEADLINE_SLACK = 1.0
+
+_bots = {}
+
+
+def _init_worker(bot_names):
+    for name in bot_names:
+        _bots[name] = load_bot(name)
+
+
+def _worker_move(bot_name, obs_fields, seed):
+    """One chess_bot call in a worker: (uci or None, error text, seconds)"""
+    obs = make_obs(**obs_fields)
+    start = time.perf_counter()
+    try:
+        uci, error = call_seeded(_bots[bot_name], obs, seed), None
+    except Exception as exc:
+        uci, error = None, '%s: %s' % (type(exc).__name__, exc)
+    return uci, error, time.perf_counter() - start
+
+
+def _worker_main(conn, bot_names):
+    _init_worker(bot_names)
+    conn.send('ready')
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        conn.send(_worker_move(*request))
+
+
+class Worker(object):
+    """A bot process behind a pipe; one move at a time"""
+
+    def __init__(self, bot_names):
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_worker_main, args=(child, bot_names))
+        self.process.daemon = True
+        self.process.start()
+        child.close()
+
+    def wait_ready(self):
+        self.conn.recv()
+
+    def call(self, bot_name, obs_fields, seed):
+        self.conn.send((bot_name, obs_fields, seed))
+        return self.conn.recv()
+
+    def kill(self):
+        # A call still blocked on the pipe gets EOFError and ends with the process
+        self.process.kill()
+        self.process.join()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.kill()
+
+
+class Arena(object):
+    """Shared state of a run: workers, output file and tallies"""
+
+    def __init__(self, bot_names, workers, out, act_timeout, overage, max_plies):
+        self.bot_names = bot_names
+        # Blocking pipe calls run here; one thread per worker plus room for respawns
+        self.threads = ThreadPoolExecutor(2 * workers)
+        self.workers = set()
+        self.free = asyncio.Queue()
+        self.out = out
+        self.act_timeout = act_timeout
+        self.overage = overage
+        self.max_plies = max_plies
+        self.rules = load_rules()
+        self.finished = 0
+        self.scores = {}
+        self.spawning = set()
+
+    async def spawn(self):
+        """Start a worker and mark it free once its bots are loaded"""
+        worker = Worker(self.bot_names)
+        self.workers.add(worker)
+        await asyncio.get_running_loop().run_in_executor(self.threads, worker.wait_ready)
+        self.free.put_nowait(worker)
+
+    def replace(self, worker):
+        """Kill a worker that can no longer be used and start a fresh one"""
+        self.workers.discard(worker)
+        worker.kill()
+        task = asyncio.ensure_future(self.spawn())
+        self.spawning.add(task)
+        task.add_done_callback(self.spawning.discard)
+
+    async def move(self, bot_name, obs_fields, deadline, seed):
+        """(uci, elapsed, error) for one move; the loop enforces the deadline"""
+        loop = asyncio.get_running_loop()
+        # Only submit to a free worker, so a move never waits behind another
+        worker = await self.free.get()
+        start = loop.time()
+        try:
+            uci, error, elapsed = await asyncio.wait_for(
+                loop.run_in_executor(self.threads, worker.call, bot_name, obs_fields, seed),
+                deadline + DEADLINE_SLACK)
+        except asyncio.TimeoutError:
+            # The call cannot be interrupted: the worker goes, a fresh one takes its place
+            self.replace(worker)
+            return None, deadline + DEADLINE_SLACK, 'timeout'
+        except (EOFError, OSError):
+            # The worker process died mid-move (a crash, the OOM killer): the move
+            # is forfeited like an illegal one and the worker replaced
+            self.replace(worker)
+            return None, loop.time() - start, 'worker died, exit code %s' % worker.process.exitcode
+        self.free.put_nowait(worker)
+        return uci, elapsed, error
+
+    def close(self):
+        for task in self.spawning:
+            task.cancel()
+        for worker in self.workers:
+            worker.stop()
+        self.threads.shutdown(wait=False, cancel_futures=True)
+
+    async def play(self, game_id, white, black, opening_plies, seed):
+        rng = random.Random(seed)
+        pos = self.rules.Position()
+        for _ in range(opening_plies):
+            moves = pos.legal_moves()
+            if not moves:
+                break
+            pos.make_move(rng.choice(moves))
+        start_fen = pos.fen
+        names = (white, black)
+        clocks = (Clock(self.act_timeout, self.overage), Clock(self.act_timeout, self.overage))
+        seen = {}
+        moves_played = []
+        times = ([], [])
+        result, reason = '1/2-1/2', 'max plies'
+        last_move = ''
+        for ply in range(self.max_plies):
+            side = pos.side
+            seen[pos.key] = seen.get(pos.key, 0) + 1
+            ended = game_over(pos, seen)
+            if ended:
+                result, reason = ended
+                break
+            legal = pos.legal_moves()
+            clock = clocks[side]
+            obs_fields = {
+                'fen': pos.fen,
+                'mark': 'white' if side == 0 else 'black',
+                'step': ply,
+                'lastMove': last_move,
+                'remainingOverageTime': clock.remaining,
+                'opponentRemainingOverageTime': clocks[side ^ 1].remaining,
+            }
+            # The opening seed also seeds the bots' random choices (v0-v8)
+            uci, elapsed, error = await self.move(names[side], obs_fields, clock.deadline, seed)
+            times[side].append(round(elapsed, 4))
+            loser = '0-1' if side == 0 else '1-0'
+            if error == 'timeout' or not clock.charge(elapsed):
+                result, reason = loser, 'timeout'
+                break
+            if error:
+                result, reason = loser, 'error (%s)' % error
+                break
+            try:
+                move = pos.parse_move(uci)
+            except Exception:
+                move = None
+            if move not in legal:
+                result, reason = loser, 'invalid move %r' % (uci,)
+                break
+            pos.make_move(move)
+            moves_played.append(uci)
+            last_move = uci
+
+        self.record(game_id, white, black, start_fen, moves_played, result, reason, times,
+                    clocks)
+
+    def record(self, game_id, white, black, start_fen, moves, result, reason, times, clocks):
+        """Stream one finished game to disk and update the tallies"""
+        self.out.write(json.dumps({
+            'game': game_id, 'white': white, 'black': black, 'start': start_fen,
+            'moves': moves, 'result': result, 'reason': reason,
+            'overage_left': [round(c.remaining, 3) for c in clocks], 'move_times': times,
+        }) + '\n')
+        self.out.flush()
+        self.finished += 1
+        points = {'1-0': (1.0, 0.0), '0-1': (0.0, 1.0)}.get(result, (0.5, 0.5))
+        for name, point in zip((white, black), points):
+            self.scores[name] = self.scores.get(name, 0.0) + point
+
+
+async def run(args):
+    bots = tuple(dict.fromkeys(args.bots))
+    pairing = (args.bots[0], args.bots[-1])
+    workers = args.workers or os.cpu_count() or 1
+    start = time.time()
+    with open(args.output, 'a') as out:
+        arena = Arena(bots, workers, out, args.act_timeout, args.overage, args.max_plies)
+        await asyncio.gather(*(arena.spawn() for _ in range(workers)))
+        games = asyncio.Semaphore(args.concurrency)
+
+        async def game(game_id):
+            async with games:
+                # Colours alternate and each opening is played from both sides
+                white, black = pairing if game_id % 2 == 0 else pairing[::-1]
+                await arena.play(game_id, white, black, args.opening_plies,
+                                 args.seed * 1000003 + game_id // 2)
+                if arena.finished % args.report_every == 0:
+                    report(arena, start)
+
+        try:
+            await asyncio.gather(*(game(i) for i in range(args.games)))
+        finally:
+            arena.close()
+    report(arena, start)
+    return arena
+
+
+def report(arena, start):
+    elapsed = time.time() - start
+    scores = ', '.join('%s %.1f' % item for item in sorted(arena.scores.items()))
+    print('%d games in %.0fs, %.1f games/min | %s' % (
+        arena.finished, elapsed, 60.0 * arena.finished / max(elapsed, 1e-9), scores))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('bots', nargs='+', help='one bot for self-play or two to match')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=200,
+                        help='games in progress at once')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes')
+    parser.add_argument('--output', default='arena.jsonl')
+    parser.add_argument('--act-timeout', type=float, default=ACT_TIMEOUT)
+    parser.add_argument('--overage', type=float, default=OVERAGE_TIME)
+    parser.add_argument('--max-plies', type=int, default=MAX_PLIES)
+    parser.add_argument('--opening-plies', type=int, default=6)
+    parser.add_argument('--report-every', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
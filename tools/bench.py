@@ -0,0 +1,81 @@
+"""
+Fixed-depth search benchmark for engines that expose `search`/`SearchInfo`
+(main_v13 and later). Prints nodes, move generations and nodes per second.
+
+    python tools/bench.py v13 --depth 4
+"""
+import argparse
+import time
+
+from botlib import load_bot
+
+BENCH_FENS = [
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+    'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3',
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+    '2r3k1/pp3ppp/2n1b3/3p4/3P4/2N1B3/PP3PPP/2R3K1 b - - 0 20',
+    '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+    '6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1',
+    '8/8/4k3/8/2K5/3P4/8/8 w - - 0 1',
+]
+
+# SearchInfo counters summed over the run, when the engine has them
+COUNTERS = ('nodes', 'qnodes', 'movegen_calls', 'quiet_gens', 'see_pruned',
+            'futility_pruned', 'reverse_futility_cuts', 'razor_cuts',
+            'probcut_cuts', 'multicut_cuts')
+
+
+def run_bench(bot, depth, fens=BENCH_FENS, verbose=True, nodes=None):
+    """
+    Search every position to a fixed depth (or node count) and return summed
+    counters. No clock is involved, so node counts repeat exactly and only
+    the time changes between runs.
+    """
+    totals = dict.fromkeys(COUNTERS, 0)
+    totals['time'] = 0.0
+    for fen in fens:
+        pos = bot.Position(fen)
+        if nodes is None:
+            info = bot.SearchInfo(max_time=float('inf'), max_depth=depth)
+        else:
+            info = bot.SearchInfo(max_time=float('inf'), max_depth=64, max_nodes=nodes)
+        start = time.time()
+        move, score, _ = bot.search(pos, info)
+        elapsed = time.time() - start
+        for name in COUNTERS:
+            totals[name] += getattr(info, name, 0)
+        totals['time'] += elapsed
+        if verbose:
+            print('%-72s %-6s %7d %8d nodes %7d movegen %6.2fs' % (
+                fen, bot.move_to_uci(move) if move else '-', score,
+                info.nodes, info.movegen_calls, elapsed))
+    return totals
+
+
+def format_totals(totals):
+    nps = totals['nodes'] / totals['time'] if totals['time'] else 0
+    counters = ', '.join('%s %d' % (name, totals[name]) for name in COUNTERS)
+    return 'total: %s, %.2fs, %d nps' % (counters, totals['time'], nps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('bot', nargs='?', default='v13')
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--nodes', type=int, default=None,
+                        help='node budget per position instead of a depth')
+    parser.add_argument('--memory', type=int, default=None,
+                        help='cache budget in MB (engines with configure_memory)')
+    args = parser.parse_args()
+
+    bot = load_bot(args.bot)
+    if args.memory and hasattr(bot, 'configure_memory'):
+        bot.configure_memory(args.memory)
+    print(format_totals(run_bench(bot, args.depth, nodes=args.nodes)))
+    if hasattr(bot, 'memory_report'):
+        print(bot.memory_report())
+
+
+if __name__ == '__main__':
+    main()
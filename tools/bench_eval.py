@@ -0,0 +1,112 @@
+"""
+Per-leaf evaluation cost: main_v12's evaluate_position against main_v13's
+tapered evaluation and its NNUE evaluator (incremental update included).
+
+    python tools/bench_eval.py --positions 200 [--weights bots/main_v13.nnue]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from botlib import load_bot
+
+
+def sample_positions(bot, count, seed=1):
+    """FENs reached by random playouts from the start position"""
+    rng = random.Random(seed)
+    fens = []
+    while len(fens) < count:
+        pos = bot.Position()
+        for _ in range(rng.randrange(4, 80)):
+            moves = pos.legal_moves()
+            if not moves:
+                break
+            pos.make_move(rng.choice(moves))
+        if pos.legal_moves():
+            fens.append(pos.fen)
+    return fens
+
+
+def random_network(bot, path, hidden=128, seed=1):
+    """Write a network with small random weights, for timing only"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    w1 = rng.integers(-64, 64, size=(bot.NNUE_FEATURES, hidden), dtype=np.int16)
+    b1 = rng.integers(-64, 64, size=hidden, dtype=np.int16)
+    w2 = rng.integers(-32, 32, size=2 * hidden, dtype=np.int8)
+    bot.save_nnue(path, w1, b1, w2, 0)
+
+
+def time_v12(fens):
+    """The leaf call as main_v12's alpha_beta makes it"""
+    v12 = load_bot('v12')
+    games = [v12.Game(fen) for fen in fens]
+    failures = 0
+    start = time.perf_counter()
+    for game in games:
+        try:
+            v12.evaluate_position(game.board, game.get_moves())
+        except Exception:
+            failures += 1
+    return (time.perf_counter() - start) / len(games), failures
+
+
+def time_v13(positions):
+    """Leaf cost as make + evaluate + unmake over every legal move"""
+    leaves = 0
+    start = time.perf_counter()
+    for pos in positions:
+        for move in pos.legal_moves():
+            pos.make_move(move)
+            pos.evaluate()
+            pos.unmake_move()
+            leaves += 1
+    total = time.perf_counter() - start
+    # Subtract the cost of the moves alone so only the evaluation remains
+    start = time.perf_counter()
+    for pos in positions:
+        for move in pos.legal_moves():
+            pos.make_move(move)
+            pos.unmake_move()
+    base = time.perf_counter() - start
+    return total / leaves, (total - base) / leaves
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--positions', type=int, default=200)
+    parser.add_argument('--weights', help='NNUE file; a random network is used if omitted')
+    parser.add_argument('--hidden', type=int, default=128)
+    args = parser.parse_args()
+
+    v13 = load_bot('v13')
+    fens = sample_positions(v13, args.positions)
+
+    try:
+        per_leaf, failures = time_v12(fens)
+        note = ' (%d calls raised)' % failures if failures else ''
+        print('main_v12 evaluate_position:  %8.1f us/leaf%s' % (per_leaf * 1e6, note))
+    except ImportError as e:
+        print('main_v12 evaluate_position:  skipped (%s)' % e)
+
+    leaf, evaluation = time_v13([v13.Position(fen) for fen in fens])
+    print('main_v13 tapered:            %8.1f us/leaf (%.1f us evaluation + update)' % (
+        leaf * 1e6, evaluation * 1e6))
+
+    if v13.import_numpy() is None:
+        print('main_v13 nnue:               skipped (NumPy not installed)')
+        return
+    path = args.weights
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), 'random.nnue')
+        random_network(v13, path, args.hidden)
+    network = v13.load_nnue(path)
+    leaf, evaluation = time_v13([v13.NnuePosition(fen, network) for fen in fens])
+    print('main_v13 nnue (%4d hidden):  %8.1f us/leaf (%.1f us evaluation + update)' % (
+        network.hidden, leaf * 1e6, evaluation * 1e6))
+
+
+if __name__ == '__main__':
+    main()
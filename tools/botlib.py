@@ -0,0 +1,86 @@
+"""Helpers shared by the scripts in tools/ for loading and driving bots."""
+import importlib.util
+import os
+import random
+
+BOTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bots')
+
+
+def resolve_bot_path(name):
+    """Accept 'v12', 'main_v12' or a path to a bot file"""
+    if os.path.exists(name):
+        return os.path.abspath(name)
+    if not name.startswith('main_'):
+        name = 'main_' + name
+    if not name.endswith('.py'):
+        name += '.py'
+    return os.path.join(BOTS_DIR, name)
+
+
+def load_bot(name):
+    """Import a bots/main_v*.py file as a module"""
+    path = resolve_bot_path(name)
+    module_name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+_rules = None
+
+
+def load_rules():
+    """
+    main_v13 for its board rules only (FENs, move generation), loaded once
+    per process and without the cache warm-up a playing copy starts
+    """
+    global _rules
+    if _rules is None:
+        previous = os.environ.get('CHESS_BOT_NO_WARMUP')
+        os.environ['CHESS_BOT_NO_WARMUP'] = '1'
+        try:
+            _rules = load_bot('v13')
+        finally:
+            if previous is None:
+                del os.environ['CHESS_BOT_NO_WARMUP']
+            else:
+                os.environ['CHESS_BOT_NO_WARMUP'] = previous
+    return _rules
+
+
+class Observation(dict):
+    """Dict with attribute access, the shape Kaggle passes as `obs`"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def make_obs(fen, **fields):
+    obs = Observation(board=fen)
+    obs.update(fields)
+    return obs
+
+
+def call_seeded(bot, obs, seed=0):
+    """
+    chess_bot with the global random generator reseeded from `seed` and the
+    board, so bots that pick among moves at random (v0-v8) repeat their
+    choices on every run
+    """
+    random.seed('%s|%s' % (seed, obs['board']))
+    return bot.chess_bot(obs)
+
+
+def seeded_agent(bot, seed=0):
+    """
+    An agent callable that plays `bot` through call_seeded; `agent.end_game`
+    is the bot's own end_game (None when it has none)
+    """
+    def agent(obs):
+        return call_seeded(bot, obs, seed)
+    agent.end_game = getattr(bot, 'end_game', None)
+    return agent
@@ -0,0 +1,136 @@
+"""
+Search-equivalence checker: runs two engine versions at a fixed depth with
+fresh hash tables and compares best move, score and node counts per
+position. On a mismatch both searches are replayed with every
+`alpha_beta`/`quiesce` call traced, and the first differing event (entry
+arguments or returned value) is reported with its move path.
+
+    python tools/equivalence.py v13 /tmp/main_v13_fast.py --positions suite.epd --depth 4
+
+Both engines need `search`/`SearchInfo` (main_v13 and later); tracing
+needs the main_v13 layout of module-level search functions and an undo
+stack whose entries start with the move.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from bench import BENCH_FENS
+from botlib import load_bot, load_rules
+from latency import load_positions
+
+TRACED = ('alpha_beta', 'quiesce')
+COMPARED = ('nodes', 'qnodes')
+MAX_EVENTS = 5000000
+
+_engines = None
+
+
+def _init_worker(names):
+    global _engines
+    _engines = [load_bot(name) for name in names]
+
+
+def run(bot, fen, depth):
+    """(move, score, counters) of a fixed-depth search on clean tables"""
+    if hasattr(bot, 'get_tables'):
+        bot.get_tables().tt.clear()
+    info = bot.SearchInfo(max_time=float('inf'), max_depth=depth)
+    move, score, _ = bot.search(bot.Position(fen), info)
+    return (bot.move_to_uci(move) if move else None, score,
+            tuple(getattr(info, name, None) for name in COMPARED))
+
+
+def trace(bot, fen, depth):
+    """Every traced call in order: ('enter'|'exit', function, path, values)"""
+    events = []
+    originals = {name: getattr(bot, name) for name in TRACED if hasattr(bot, name)}
+
+    def wrap(name, function):
+        def traced(pos, *args):
+            path = tuple(entry[0] for entry in pos.stack)
+            if len(events) < MAX_EVENTS:
+                # Arguments between the position and SearchInfo: depth, bounds, ply
+                events.append(('enter', name, path, args[:-1]))
+            result = function(pos, *args)
+            if len(events) < MAX_EVENTS:
+                events.append(('exit', name, path, result))
+            return result
+        return traced
+
+    for name, function in originals.items():
+        # Recursive calls look the name up in the module, so they are traced too
+        setattr(bot, name, wrap(name, function))
+    try:
+        run(bot, fen, depth)
+    finally:
+        for name, function in originals.items():
+            setattr(bot, name, function)
+    return events
+
+
+def first_divergence(events_a, events_b):
+    """Index of the first differing event, or None"""
+    for index, (a, b) in enumerate(zip(events_a, events_b)):
+        if a != b:
+            return index
+    if len(events_a) != len(events_b):
+        return min(len(events_a), len(events_b))
+    return None
+
+
+def check(fen, depth):
+    """None when both engines agree, else a dict describing the difference"""
+    a, b = _engines
+    result_a, result_b = run(a, fen, depth), run(b, fen, depth)
+    if result_a == result_b:
+        return None
+    diff = {'fen': fen, 'a': result_a, 'b': result_b}
+    events_a, events_b = trace(a, fen, depth), trace(b, fen, depth)
+    index = first_divergence(events_a, events_b)
+    if index is not None:
+        def describe(events, bot):
+            if index >= len(events):
+                return '(no event: search ended)'
+            kind, name, path, values = events[index]
+            moves = ' '.join(bot.move_to_uci(m) for m in path) or '(root)'
+            return '%s %s at %s: %r' % (kind, name, moves, values)
+        diff['event'] = index
+        diff['event_a'] = describe(events_a, a)
+        diff['event_b'] = describe(events_b, b)
+    return diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('engine_a')
+    parser.add_argument('engine_b')
+    parser.add_argument('--positions', default=None,
+                        help='FEN/EPD file, .jsonl games or .bin records (default: bench set)')
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.positions:
+        fens = load_positions(args.positions, load_rules(), args.count)
+    else:
+        fens = list(BENCH_FENS)
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker,
+                             initargs=((args.engine_a, args.engine_b),)) as pool:
+        diffs = [d for d in pool.map(check, fens, [args.depth] * len(fens)) if d]
+
+    for diff in diffs:
+        (move_a, score_a, counts_a), (move_b, score_b, counts_b) = diff['a'], diff['b']
+        print(diff['fen'])
+        print('  move %s / %s, score %s / %s, %s %s / %s' % (
+            move_a, move_b, score_a, score_b, '+'.join(COMPARED), counts_a, counts_b))
+        if 'event' in diff:
+            print('  first divergence at event %d' % diff['event'])
+            print('    A: %s' % diff['event_a'])
+            print('    B: %s' % diff['event_b'])
+    print('%d positions at depth %d: %d identical, %d differ' % (
+        len(fens), args.depth, len(fens) - len(diffs), len(diffs)))
+
+
+if __name__ == '__main__':
+    main()
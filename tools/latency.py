@@ -0,0 +1,129 @@
+"""
+Per-move latency harness: replays positions through each bot's chess_bot
+and reports p50/p95/p99/max wall time, moves over budget and the positions
+behind the slowest moves, optionally with CPU-burning workers alongside.
+
+    python tools/latency.py v12 v13 --positions arena.jsonl --count 2000 --load 3
+
+Positions come from self-play records (.bin), arena/referee game logs
+(.jsonl, every position of every game), a file with one FEN or EPD per
+line, or random playouts when no file is given.
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import time
+
+from bench_eval import sample_positions
+from botlib import call_seeded, load_bot, load_rules, make_obs
+from records import iter_records
+
+
+def load_positions(path, rules, count, seed=1):
+    """Up to `count` FENs sampled from `path` (or random playouts)"""
+    if path is None:
+        return sample_positions(rules, count, seed)
+    if path.endswith('.bin'):
+        fens = [record.fen for record in iter_records(path)]
+    elif path.endswith('.jsonl'):
+        fens = []
+        with open(path) as f:
+            for line in f:
+                game = json.loads(line)
+                pos = rules.Position(game['start'])
+                for uci in game['moves']:
+                    fens.append(pos.fen)
+                    pos.apply_move(uci)
+    else:
+        fens = []
+        with open(path) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 4 or line.startswith('#'):
+                    continue
+                # FENs end in the two move counters; EPD lines have operations there instead
+                counters = fields[4:6]
+                if len(counters) < 2 or not all(c.isdigit() for c in counters):
+                    counters = ['0', '1']
+                fens.append(' '.join(fields[:4] + counters))
+    fens = [fen for fen in fens if rules.Position(fen).has_legal_move()]
+    if len(fens) > count:
+        fens = random.Random(seed).sample(fens, count)
+    return fens
+
+
+def _burn(stop):
+    """Background load: pure-Python work until told to stop"""
+    x = 0
+    while not stop.is_set():
+        for i in range(10000):
+            x = (x * 31 + i) & 0xffffffff
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def measure(bot, fens, overage=10.0, seed=1):
+    """(seconds, fen) per chess_bot call, in order; random choices are seeded"""
+    timings = []
+    for step, fen in enumerate(fens):
+        obs = make_obs(fen, remainingOverageTime=overage, step=step)
+        start = time.perf_counter()
+        call_seeded(bot, obs, seed)
+        timings.append((time.perf_counter() - start, fen))
+    return timings
+
+
+def report(name, timings, budget, outliers):
+    values = sorted(t for t, _ in timings)
+    over = sum(1 for t in values if t > budget)
+    print('%-8s %5d moves  p50 %7.1f  p95 %7.1f  p99 %7.1f  max %7.1f ms  over %.2fs: %d' % (
+        name, len(values), 1000 * percentile(values, 0.50), 1000 * percentile(values, 0.95),
+        1000 * percentile(values, 0.99), 1000 * values[-1], budget, over))
+    for seconds, fen in sorted(timings, reverse=True)[:outliers]:
+        print('    %7.1f ms  %s' % (1000 * seconds, fen))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('bots', nargs='+')
+    parser.add_argument('--positions', default=None, help='.bin records, .jsonl games or FEN/EPD file')
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--budget', type=float, default=1.0, help='seconds per move')
+    parser.add_argument('--load', type=int, default=0, help='CPU-burning background processes')
+    parser.add_argument('--outliers', type=int, default=5, help='slowest positions to list')
+    parser.add_argument('--dump', default=None, help='write over-budget FENs here')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    fens = load_positions(args.positions, load_rules(), args.count, args.seed)
+    stop = multiprocessing.Event()
+    burners = [multiprocessing.Process(target=_burn, args=(stop,)) for _ in range(args.load)]
+    for process in burners:
+        process.daemon = True
+        process.start()
+    print('%d positions, %d background workers' % (len(fens), args.load))
+    slow = []
+    try:
+        for name in args.bots:
+            timings = measure(load_bot(name), fens, seed=args.seed)
+            report(name, timings, args.budget, args.outliers)
+            slow.extend((name, t, fen) for t, fen in timings if t > args.budget)
+    finally:
+        stop.set()
+        for process in burners:
+            process.join()
+    if args.dump:
+        with open(args.dump, 'w') as f:
+            for name, seconds, fen in slow:
+                f.write('%s ; %s %.3fs\n' % (fen, name, seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Memory and garbage-collector profile of chess_bot, per move and per phase.
+
+For every move it records the traced peak (tracemalloc), net allocated
+blocks, collections per generation and the time spent in collector
+pauses, split over the phases main_v13's chess_bot goes through. During
+the search, tracemalloc snapshots are sampled and compared with the start
+of the search to rank the source lines holding the most memory, and
+--limit-kb turns the per-move peak into a pass/fail guard.
+
+    python tools/memprof.py v13 --count 50 --depth 4
+    python tools/memprof.py v13 --count 50 --no-gc      # GC_DURING_SEARCH = False
+
+Tracing slows the bots down several times, so use --depth (FIXED_DEPTH)
+to keep the searched trees comparable with untraced runs.
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from botlib import load_bot, load_rules, make_obs
+from latency import load_positions, percentile
+
+# Functions chess_bot calls in turn; each one is a phase when present
+PHASES = ('new_position', 'game_history', 'find_mate_in_one', 'prove_mate', 'search')
+# Snapshots show the profiler's own allocations too; keep them out
+SNAPSHOT_FILTERS = (tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, __file__))
+
+
+def new_record():
+    return {'peak': 0, 'base': 0, 'blocks': 0, 'time': 0.0, 'collections': [0, 0, 0],
+            'gc_time': 0.0, 'gc_max': 0.0}
+
+
+class Profiler(object):
+    """Nested records (the move, then its phase); GC events count towards all open ones"""
+
+    def __init__(self, sample_every):
+        self.active = []
+        self.moves = []
+        self.phases = {}
+        self.sites = {}
+        self.samples = 0
+        self.sample_every = sample_every
+        self.calls = 0
+        self.baseline = None
+        self.gc_start = None
+
+    def on_gc(self, phase, info):
+        if phase == 'start':
+            self.gc_start = time.perf_counter()
+        elif self.gc_start is not None:
+            pause = time.perf_counter() - self.gc_start
+            for record in self.active:
+                record['collections'][info['generation']] += 1
+                record['gc_time'] += pause
+                record['gc_max'] = max(record['gc_max'], pause)
+
+    def fold_peak(self):
+        """Credit the peak since the last reset to every open record"""
+        peak = tracemalloc.get_traced_memory()[1]
+        for record in self.active:
+            record['peak'] = max(record['peak'], peak - record['base'])
+        tracemalloc.reset_peak()
+
+    def open(self):
+        self.fold_peak()
+        record = new_record()
+        record['base'] = tracemalloc.get_traced_memory()[0]
+        record['blocks'] = sys.getallocatedblocks()
+        record['time'] = time.perf_counter()
+        self.active.append(record)
+        return record
+
+    def close(self, record):
+        self.fold_peak()
+        self.active.remove(record)
+        record['blocks'] = sys.getallocatedblocks() - record['blocks']
+        record['time'] = time.perf_counter() - record['time']
+        return record
+
+    def sample(self):
+        """Memory held per source line now, relative to the start of the search"""
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        for stat in snapshot.compare_to(self.baseline, 'lineno'):
+            if stat.size_diff > 0:
+                frame = stat.traceback[0]
+                site = '%s:%d' % (frame.filename, frame.lineno)
+                size, count = self.sites.get(site, (0, 0))
+                self.sites[site] = (size + stat.size_diff, count + max(stat.count_diff, 0))
+        self.samples += 1
+
+    def wrap_phase(self, name, function):
+        def phase(*args, **kwargs):
+            if name == 'search':
+                # Sites are relative to the search, after any per-move table reset
+                self.baseline = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+            record = self.open()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.phases.setdefault(name, []).append(self.close(record))
+        return phase
+
+    def wrap_search_node(self, function):
+        def node(*args, **kwargs):
+            self.calls += 1
+            if self.sample_every and self.calls % self.sample_every == 0:
+                self.sample()
+            return function(*args, **kwargs)
+        return node
+
+    def play(self, bot, fen):
+        record = self.open()
+        bot.chess_bot(make_obs(fen))
+        record = self.close(record)
+        record['fen'] = fen
+        self.moves.append(record)
+
+
+def summarize(name, records):
+    peaks = sorted(r['peak'] for r in records)
+    pauses = sorted(r['gc_time'] for r in records)
+    collections = [sum(r['collections'][g] for r in records) for g in range(3)]
+    print('%-16s %5d  peak p50 %8.1f KB  max %8.1f KB  net blocks %+8d  '
+          'gc %d/%d/%d  pause total %6.1f ms  p99 %5.1f  max %5.1f ms' % (
+              name, len(records), percentile(peaks, 0.5) / 1024.0, peaks[-1] / 1024.0,
+              sum(r['blocks'] for r in records) // max(len(records), 1),
+              collections[0], collections[1], collections[2], 1000 * sum(pauses),
+              1000 * percentile(pauses, 0.99), 1000 * max(r['gc_max'] for r in records)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('bot', nargs='?', default='v13')
+    parser.add_argument('--positions', default=None)
+    parser.add_argument('--count', type=int, default=50)
+    parser.add_argument('--depth', type=int, default=None, help='FIXED_DEPTH for v13-style bots')
+    parser.add_argument('--no-gc', action='store_true', help='set GC_DURING_SEARCH = False')
+    parser.add_argument('--sample-every', type=int, default=5000,
+                        help='search calls between allocation-site samples (0: off)')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--frames', type=int, default=1)
+    parser.add_argument('--limit-kb', type=float, default=None,
+                        help='list moves whose peak exceeds this and exit non-zero')
+    args = parser.parse_args()
+
+    bot = load_bot(args.bot)
+    fens = load_positions(args.positions, load_rules(), args.count)
+    if args.depth is not None and hasattr(bot, 'FIXED_DEPTH'):
+        bot.FIXED_DEPTH = args.depth
+    if args.no_gc:
+        bot.GC_DURING_SEARCH = False
+
+    tracemalloc.start(args.frames)
+    # The first call allocates the long-lived tables; keep it out of the figures,
+    # but traced, so that later table resets balance out
+    bot.chess_bot(make_obs(fens[0]))
+
+    profiler = Profiler(args.sample_every)
+    for name in PHASES:
+        if hasattr(bot, name):
+            setattr(bot, name, profiler.wrap_phase(name, getattr(bot, name)))
+    if hasattr(bot, 'alpha_beta'):
+        # Recursive calls go through the module, so every node is seen
+        bot.alpha_beta = profiler.wrap_search_node(bot.alpha_beta)
+
+    gc.callbacks.append(profiler.on_gc)
+    try:
+        for fen in fens:
+            profiler.play(bot, fen)
+    finally:
+        tracemalloc.stop()
+        gc.callbacks.remove(profiler.on_gc)
+
+    print('%d moves, GC during search %s' % (len(profiler.moves),
+                                            'off' if args.no_gc else 'on'))
+    summarize('move', profiler.moves)
+    for name in PHASES:
+        if name in profiler.phases:
+            summarize('  ' + name, profiler.phases[name])
+    if profiler.sites:
+        print('top allocation sites (mean memory held at %d search samples):' % profiler.samples)
+        ranked = sorted(profiler.sites.items(), key=lambda item: item[1][0], reverse=True)
+        for site, (size, count) in ranked[:args.top]:
+            print('  %9.1f KB %8d blocks  %s' % (size / 1024.0 / profiler.samples,
+                                                 count // profiler.samples, site))
+    if args.limit_kb is not None:
+        over = [r for r in profiler.moves if r['peak'] > args.limit_kb * 1024]
+        for record in over:
+            print('over %.0f KB: %8.1f KB  %s' % (args.limit_kb, record['peak'] / 1024.0, record['fen']))
+        if over:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
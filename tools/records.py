@@ -0,0 +1,100 @@
+"""
+Fixed-width binary position records for training and tuning data.
+
+Each record is 32 bytes, little-endian:
+
+    u64   occupancy bitboard (bit i set when square i is occupied, a8 = 0)
+    16s   piece codes, 4 bits each, for the occupied squares in order
+          (main_v13 encoding: 1-6 white PNBRQK, 9-14 black)
+    i16   search score, side to move's view (SCORE_UNKNOWN if not searched)
+    u16   best move, main_v13 encoding (from | to << 6 | promotion << 12)
+    u32   side (1 bit) | castling (4) | en passant file + 1 (4) |
+          halfmove clock (7) | fullmove number (12) | result (2)
+
+The result is from white's point of view: 0 loss, 1 draw, 2 win, 3 unknown.
+"""
+import collections
+import struct
+
+RECORD = struct.Struct('<Q16shHI')
+RECORD_SIZE = RECORD.size
+SCORE_UNKNOWN = -0x8000
+RESULT_LOSS, RESULT_DRAW, RESULT_WIN, RESULT_UNKNOWN = 0, 1, 2, 3
+
+PIECE_CHARS = ' PNBRQK  pnbrqk'
+CASTLE_CHARS = 'KQkq'
+
+Record = collections.namedtuple('Record', 'fen score move result')
+
+
+def pack_record(squares, side, castling, ep, halfmove, fullmove, score, move, result):
+    """Pack one position; squares is the 64-entry main_v13 piece list"""
+    occupancy = 0
+    nibbles = 0
+    count = 0
+    for sq, piece in enumerate(squares):
+        if piece:
+            occupancy |= 1 << sq
+            nibbles |= piece << (4 * count)
+            count += 1
+    if score is None:
+        score = SCORE_UNKNOWN
+    score = max(-0x7fff, min(0x7fff, score)) if score != SCORE_UNKNOWN else score
+    ep_field = (ep % 8) + 1 if ep >= 0 else 0
+    flags = (side | castling << 1 | ep_field << 5 | min(halfmove, 127) << 9
+             | min(fullmove, 4095) << 16 | result << 28)
+    return RECORD.pack(occupancy, nibbles.to_bytes(16, 'little'), score, move or 0, flags)
+
+
+def unpack_record(data, offset=0):
+    """Decode one record into (fen, score or None, move, result)"""
+    occupancy, packed, score, move, flags = RECORD.unpack_from(data, offset)
+    nibbles = int.from_bytes(packed, 'little')
+    squares = [0] * 64
+    count = 0
+    for sq in range(64):
+        if occupancy >> sq & 1:
+            squares[sq] = (nibbles >> (4 * count)) & 15
+            count += 1
+    side = flags & 1
+    castling = (flags >> 1) & 15
+    ep_field = (flags >> 5) & 15
+    halfmove = (flags >> 9) & 127
+    fullmove = (flags >> 16) & 4095
+    result = (flags >> 28) & 3
+
+    rows = []
+    for rank in range(8):
+        row, empty = '', 0
+        for piece in squares[rank * 8:rank * 8 + 8]:
+            if piece:
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += PIECE_CHARS[piece]
+            else:
+                empty += 1
+        rows.append(row + (str(empty) if empty else ''))
+    rights = ''.join(c for i, c in enumerate(CASTLE_CHARS) if castling >> i & 1) or '-'
+    if ep_field:
+        ep = 'abcdefgh'[ep_field - 1] + ('6' if side == 0 else '3')
+    else:
+        ep = '-'
+    fen = '%s %s %s %s %d %d' % ('/'.join(rows), 'wb'[side], rights, ep, halfmove, fullmove)
+    return Record(fen, None if score == SCORE_UNKNOWN else score, move, result)
+
+
+def iter_records(path, batch=4096):
+    """Stream records from a file without loading it whole"""
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(RECORD_SIZE * batch)
+            if not data:
+                break
+            for offset in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+                yield unpack_record(data, offset)
+
+
+def count_records(path):
+    import os
+    return os.path.getsize(path) // RECORD_SIZE
@@ -0,0 +1,242 @@
+"""
+In-process stand-in for the Kaggle chess environment.
+
+Agents get the same `obs`/`config` shapes and are held to the same rules:
+an illegal or missing move is INVALID, an exception is ERROR, and time
+over `actTimeout` comes out of `remainingOverageTime`, which running out
+makes a TIMEOUT. Games run at the speed of the bots; the batch mode plays
+many in a process pool.
+
+    python tools/referee.py v13 v12 --games 20 --workers 4
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from botlib import Observation, load_bot, load_rules, seeded_agent
+
+# Kaggle chess defaults: 0.1 s per move free, 10 s of overage per game
+ACT_TIMEOUT = 0.1
+OVERAGE_TIME = 10.0
+EPISODE_STEPS = 400
+
+ACTIVE, INACTIVE, DONE = 'ACTIVE', 'INACTIVE', 'DONE'
+INVALID, ERROR, TIMEOUT = 'INVALID', 'ERROR', 'TIMEOUT'
+MARKS = ('white', 'black')
+
+
+def make_configuration(**overrides):
+    config = Observation(episodeSteps=EPISODE_STEPS, actTimeout=ACT_TIMEOUT,
+                         remainingOverageTime=OVERAGE_TIME, runTimeout=9600, seed=None)
+    config.update(overrides)
+    return config
+
+
+def make_observation(pos, step, last_move, clocks):
+    """The obs handed to the side to move"""
+    side = pos.side
+    return Observation(board=pos.fen, mark=MARKS[side], step=step, lastMove=last_move,
+                       remainingOverageTime=clocks[side].remaining,
+                       opponentRemainingOverageTime=clocks[side ^ 1].remaining)
+
+
+class Clock(object):
+    """Kaggle-style move clock: time over the act timeout comes out of the overage bank"""
+
+    def __init__(self, act_timeout=ACT_TIMEOUT, overage=OVERAGE_TIME):
+        self.act_timeout = act_timeout
+        self.remaining = overage
+
+    @property
+    def deadline(self):
+        """Longest a move may take before the side loses on time"""
+        return self.act_timeout + max(self.remaining, 0.0)
+
+    def charge(self, elapsed):
+        """Book one move's time; False when the overage bank ran out"""
+        self.remaining -= max(0.0, elapsed - self.act_timeout)
+        return self.remaining >= 0
+
+
+def insufficient_material(squares):
+    """Bare kings, or a single minor piece against a bare king"""
+    minors = 0
+    for piece in squares:
+        ptype = piece & 7
+        if ptype in (1, 4, 5):
+            return False
+        if ptype in (2, 3):
+            minors += 1
+    return minors <= 1
+
+
+def game_over(pos, seen):
+    """(result, reason) when the game has ended on the board, else None"""
+    if not pos.has_legal_move():
+        if pos.in_check():
+            return ('0-1' if pos.side == 0 else '1-0'), 'checkmate'
+        return '1/2-1/2', 'stalemate'
+    if seen.get(pos.key, 0) >= 3:
+        return '1/2-1/2', 'repetition'
+    if pos.halfmove >= 100:
+        return '1/2-1/2', 'fifty moves'
+    if insufficient_material(pos.squares):
+        return '1/2-1/2', 'insufficient material'
+    return None
+
+
+def forfeit(pos, status, detail):
+    """Result when the side to move breaks a rule"""
+    return ('0-1' if pos.side == 0 else '1-0'), '%s (%s)' % (status.lower(), detail)
+
+
+def call_agent(agent, obs, config):
+    """(action, error, seconds); agents taking two arguments also get config"""
+    start = time.perf_counter()
+    try:
+        if getattr(getattr(agent, '__code__', None), 'co_argcount', 1) >= 2:
+            action = agent(obs, config)
+        else:
+            action = agent(obs)
+        error = None
+    except Exception as exc:
+        action, error = None, '%s: %s' % (type(exc).__name__, exc)
+    return action, error, time.perf_counter() - start
+
+
+def play_game(agents, configuration=None, start_fen=None, rules=None):
+    """
+    Play one game between two agent callables (white first) and return a
+    dict with result, reason, moves, per-agent statuses and rewards.
+    """
+    rules = rules or load_rules()
+    config = configuration or make_configuration()
+    pos = rules.Position(start_fen) if start_fen else rules.Position()
+    clocks = (Clock(config.actTimeout, config.remainingOverageTime),
+              Clock(config.actTimeout, config.remainingOverageTime))
+    statuses = [ACTIVE, INACTIVE] if pos.side == 0 else [INACTIVE, ACTIVE]
+    seen = {}
+    moves = []
+    result, reason = '1/2-1/2', 'episode steps'
+    last_move = ''
+    for step in range(config.episodeSteps):
+        seen[pos.key] = seen.get(pos.key, 0) + 1
+        ended = game_over(pos, seen)
+        if ended:
+            result, reason = ended
+            break
+        side = pos.side
+        action, error, elapsed = call_agent(agents[side], make_observation(pos, step, last_move, clocks),
+                                            config)
+        if not clocks[side].charge(elapsed):
+            statuses[side] = TIMEOUT
+            result, reason = forfeit(pos, TIMEOUT, '%.2fs' % elapsed)
+            break
+        if error:
+            statuses[side] = ERROR
+            result, reason = forfeit(pos, ERROR, error)
+            break
+        try:
+            move = pos.parse_move(action)
+        except Exception:
+            move = 0
+        if not move or move not in pos.legal_moves():
+            statuses[side] = INVALID
+            result, reason = forfeit(pos, INVALID, repr(action))
+            break
+        pos.make_move(move)
+        moves.append(action)
+        last_move = action
+        statuses[side], statuses[side ^ 1] = INACTIVE, ACTIVE
+
+    # Bots that keep working between calls (main_v13 pondering) stop with the game
+    for agent in agents:
+        end_game = getattr(agent, 'end_game', None)
+        if end_game is not None:
+            end_game()
+
+    # Kaggle scores a win 1, a loss -1 and a draw 0; a faulting agent gets None
+    rewards = {'1-0': [1, -1], '0-1': [-1, 1]}.get(result, [0, 0])
+    for side in (0, 1):
+        if statuses[side] in (INVALID, ERROR, TIMEOUT):
+            rewards[side] = None
+        else:
+            statuses[side] = DONE
+    return {'result': result, 'reason': reason, 'moves': moves, 'statuses': statuses,
+            'rewards': rewards, 'overage_left': [c.remaining for c in clocks],
+            'start': start_fen or rules.START_FEN}
+
+
+# Batch mode: each worker loads the bots once and plays whole games
+
+_bots = {}
+_rules = None
+
+
+def _init_worker(bot_names):
+    global _rules
+    for name in bot_names:
+        _bots[name] = load_bot(name)
+    _rules = _bots[bot_names[0]] if hasattr(_bots[bot_names[0]], 'Position') else load_rules()
+
+
+def _play_one(white, black, config, opening_plies, seed):
+    rng = random.Random(seed)
+    pos = _rules.Position()
+    for _ in range(opening_plies):
+        moves = pos.legal_moves()
+        if not moves:
+            break
+        pos.make_move(rng.choice(moves))
+    # The opening seed also seeds the bots' random choices (v0-v8), so a batch replays exactly
+    game = play_game((seeded_agent(_bots[white], seed), seeded_agent(_bots[black], seed)),
+                     config, pos.fen, _rules)
+    game['white'], game['black'] = white, black
+    return game
+
+
+def play_batch(names, games, workers=None, config=None, opening_plies=6, seed=1):
+    """Yield finished games as they complete; colours alternate per opening"""
+    config = config or make_configuration()
+    pairing = (names[0], names[-1])
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(tuple(dict.fromkeys(names)),)) as pool:
+        futures = []
+        for game in range(games):
+            white, black = pairing if game % 2 == 0 else pairing[::-1]
+            futures.append(pool.submit(_play_one, white, black, config, opening_plies,
+                                       seed * 1000003 + game // 2))
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('bots', nargs='+', help='one bot for self-play or two to match')
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--act-timeout', type=float, default=ACT_TIMEOUT)
+    parser.add_argument('--overage', type=float, default=OVERAGE_TIME)
+    parser.add_argument('--episode-steps', type=int, default=EPISODE_STEPS)
+    parser.add_argument('--opening-plies', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    config = make_configuration(actTimeout=args.act_timeout, remainingOverageTime=args.overage,
+                                episodeSteps=args.episode_steps)
+    start = time.time()
+    scores = {}
+    for done, game in enumerate(play_batch(args.bots, args.games, args.workers, config,
+                                           args.opening_plies, args.seed), 1):
+        points = {'1-0': (1.0, 0.0), '0-1': (0.0, 1.0)}.get(game['result'], (0.5, 0.5))
+        for name, point in zip((game['white'], game['black']), points):
+            scores[name] = scores.get(name, 0.0) + point
+        print('%3d %s-%s %s %s, %d plies' % (done, game['white'], game['black'], game['result'],
+                                             game['reason'], len(game['moves'])))
+    print('%d games in %.0fs | %s' % (args.games, time.time() - start,
+                                      ', '.join('%s %.1f' % s for s in sorted(scores.items()))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""
+Search-tree trace recorder. While a traced chess_bot call runs, every
+`alpha_beta` node (and `quiesce` node for main_v13) leaves one fixed-size
+binary record in a ring buffer: ply, move, remaining depth, window, score,
+how the node ended, position key and timing. When the move has been
+returned the buffer is handed as it is to a writer thread and a second
+preallocated buffer takes its place, so neither copying nor file I/O is
+charged to the move.
+
+    python tools/searchtrace.py v12 --positions blunders.epd --out v12.trace
+    python tools/searchtrace.py v12 --opponent v13 --out game.trace --sample-moves 2
+    python tools/traceview.py v12.trace
+
+Overhead is limited by tracing only one move in --sample-moves (the others
+run with the original functions in place), by recording nodes only down
+to --max-ply and by leaving quiescence nodes out (--no-qsearch). The
+searches still check their own clocks, so traced moves search fewer nodes
+than untraced ones; --depth fixes the depth for v13-style bots.
+
+Records are written in post-order (a node after its children); the ply
+field is enough to rebuild the tree from that. When a search outgrows the
+ring buffer the oldest records are dropped, which loses whole early
+subtrees but keeps everything after them consistent.
+"""
+import argparse
+import queue
+import struct
+import threading
+import time
+import zlib
+
+from botlib import load_bot, load_rules, make_obs
+from latency import load_positions
+
+MAGIC = b'STRC'
+# Per move: magic, records, dropped records, seconds, chosen move, FEN length
+HEADER = struct.Struct('<4sIId5sH')
+# Per node: ply, reason, depth, flags, move, key, alpha, beta, score,
+# start and duration in microseconds from the start of the move
+RECORD = struct.Struct('<BBbBHIiiiII')
+
+EXACT, FAIL_HIGH, FAIL_LOW, STOPPED, ERROR = 0, 1, 2, 3, 4
+REASONS = ('exact', 'fail-high', 'fail-low', 'stopped', 'error')
+QSEARCH, LEAF, MIN_NODE = 1, 2, 4
+INT_LIMIT = (1 << 31) - 1
+
+
+def clamp(value):
+    """Scores and bounds as int32; v12 uses infinite windows"""
+    return int(max(-INT_LIMIT, min(INT_LIMIT, value)))
+
+
+def encode_uci(uci):
+    """UCI string as main_v13's move int (from | to << 6 | promo << 12)"""
+    if not uci:
+        return 0
+    frm = (8 - int(uci[1])) * 8 + ord(uci[0]) - 97
+    to = (8 - int(uci[3])) * 8 + ord(uci[2]) - 97
+    promo = ' nbrq'.find(uci[4]) + 1 if len(uci) > 4 else 0
+    return frm | to << 6 | promo << 12
+
+
+class TraceRecorder(object):
+    """Wraps a bot module's search functions; attach() installs, close() flushes and restores"""
+
+    def __init__(self, path, capacity=1 << 18, sample_moves=1, max_ply=64, qsearch=True):
+        self.path = path
+        self.capacity = capacity
+        self.sample_moves = max(1, sample_moves)
+        self.max_ply = max_ply
+        self.qsearch = qsearch
+        # Two buffers: one recording while the writer drains the other
+        self.free = queue.Queue()
+        self.free.put(bytearray(capacity * RECORD.size))
+        self.free.put(bytearray(capacity * RECORD.size))
+        self.buffer = None
+        self.count = 0
+        self.ply = 0
+        self.children = [0]
+        self.heights = [-1]
+        self.origin = 0
+        self.calls = 0
+        self.traced = 0
+        self.bot = None
+        self.originals = {}
+        self.wrappers = {}
+        self.queue = queue.Queue()
+        self.writer = threading.Thread(target=self._write, name='searchtrace-writer')
+        self.writer.daemon = True
+
+    def record(self, depth, move, key, alpha, beta, score, flags, start, abort):
+        """Close the innermost open node; `abort` is STOPPED, ERROR or 0"""
+        end = time.perf_counter_ns()
+        leaf = self.children.pop() == 0
+        self.heights.pop()
+        self.ply -= 1
+        self.children[-1] += 1
+        if self.ply > self.max_ply:
+            return
+        if abort:
+            reason = abort
+        elif flags & MIN_NODE:
+            # v12 scores are from the root side's view; a min node cuts at or below alpha
+            reason = FAIL_HIGH if score <= alpha else FAIL_LOW if score >= beta else EXACT
+        else:
+            reason = FAIL_HIGH if score >= beta else FAIL_LOW if score <= alpha else EXACT
+        offset = (self.count % self.capacity) * RECORD.size
+        RECORD.pack_into(self.buffer, offset, self.ply, reason, max(-128, min(127, depth)),
+                         flags | (LEAF if leaf else 0), move, key & 0xffffffff,
+                         clamp(alpha), clamp(beta), clamp(score),
+                         min((start - self.origin) // 1000, 0xffffffff),
+                         min((end - start) // 1000, 0xffffffff))
+        self.count += 1
+
+    def enter(self, height=None):
+        self.ply += 1
+        self.children.append(0)
+        self.heights.append(height)
+        return time.perf_counter_ns()
+
+    def last_move(self, pos):
+        """Move into this node, or 0 at the root and where alpha_beta hands over to quiesce"""
+        height = len(pos.stack)
+        return pos.stack[-1][0] if height and height != self.heights[-1] else 0
+
+    def _wrap_v12(self, function):
+        def alpha_beta(game, depth, alpha, beta, maximizing, start_time, max_time=0.95):
+            # Children are fresh Games with exactly one move applied
+            move = encode_uci(game.move_history[-1]) if game.move_history else 0
+            key = zlib.crc32(str(game).rsplit(' ', 2)[0].encode())
+            flags = 0 if maximizing else MIN_NODE
+            start = self.enter()
+            try:
+                result = function(game, depth, alpha, beta, maximizing, start_time, max_time)
+            except Exception:
+                self.record(depth, move, key, alpha, beta, 0, flags, start, ERROR)
+                raise
+            self.record(depth, move, key, alpha, beta, result[1], flags, start,
+                        STOPPED if time.time() - start_time > max_time else 0)
+            return result
+        return alpha_beta
+
+    def _wrap_v13(self, function):
+        def alpha_beta(pos, depth, alpha, beta, ply, info):
+            move = self.last_move(pos) if ply else 0
+            start = self.enter(len(pos.stack))
+            try:
+                result = function(pos, depth, alpha, beta, ply, info)
+            except Exception:
+                self.record(depth, move, pos.key, alpha, beta, 0, 0, start, ERROR)
+                raise
+            self.record(depth, move, pos.key, alpha, beta, result[1], 0, start,
+                        STOPPED if info.stopped else 0)
+            return result
+        return alpha_beta
+
+    def _wrap_quiesce(self, function):
+        def quiesce(pos, alpha, beta, ply, info):
+            move = self.last_move(pos) if ply else 0
+            start = self.enter(len(pos.stack))
+            try:
+                score = function(pos, alpha, beta, ply, info)
+            except Exception:
+                self.record(0, move, pos.key, alpha, beta, 0, QSEARCH, start, ERROR)
+                raise
+            self.record(0, move, pos.key, alpha, beta, score, QSEARCH, start,
+                        STOPPED if info.stopped else 0)
+            return score
+        return quiesce
+
+    def attach(self, bot):
+        """Trace `bot` (a loaded main_v* module) from its next chess_bot call"""
+        self.bot = bot
+        if hasattr(bot, 'SearchInfo'):
+            self.wrappers['alpha_beta'] = self._wrap_v13(bot.alpha_beta)
+            if self.qsearch and hasattr(bot, 'quiesce'):
+                self.wrappers['quiesce'] = self._wrap_quiesce(bot.quiesce)
+        else:
+            self.wrappers['alpha_beta'] = self._wrap_v12(bot.alpha_beta)
+        self.originals = dict((name, getattr(bot, name)) for name in self.wrappers)
+        self.originals['chess_bot'] = chess_bot = bot.chess_bot
+
+        def traced_chess_bot(obs, *args):
+            self.calls += 1
+            if (self.calls - 1) % self.sample_moves:
+                return chess_bot(obs, *args)
+            # Waits only when the writer is still on the move before last
+            self.buffer = self.free.get()
+            self.count, self.ply, self.children, self.heights = 0, 0, [0], [-1]
+            self.origin = time.perf_counter_ns()
+            for name, wrapper in self.wrappers.items():
+                setattr(bot, name, wrapper)
+            try:
+                move = chess_bot(obs, *args)
+            finally:
+                for name in self.wrappers:
+                    setattr(bot, name, self.originals[name])
+            self._flush(obs['board'], move, (time.perf_counter_ns() - self.origin) / 1e9)
+            return move
+
+        bot.chess_bot = traced_chess_bot
+        self.writer.start()
+        return self
+
+    def _flush(self, fen, move, seconds):
+        """Hand this move's buffer to the writer thread; nothing is copied here"""
+        records = min(self.count, self.capacity)
+        fen = fen.encode()
+        header = HEADER.pack(MAGIC, records, self.count - records, seconds,
+                             (move or '').encode(), len(fen))
+        self.queue.put((header + fen, self.buffer, self.count))
+        self.buffer = None
+        self.traced += 1
+
+    def _write(self):
+        with open(self.path, 'wb') as f:
+            while True:
+                block = self.queue.get()
+                if block is None:
+                    break
+                header, buffer, count = block
+                f.write(header)
+                view = memoryview(buffer)
+                if count > self.capacity:
+                    # The ring wrapped: oldest records first
+                    split = (count % self.capacity) * RECORD.size
+                    f.write(view[split:])
+                    f.write(view[:split])
+                else:
+                    f.write(view[:count * RECORD.size])
+                view.release()
+                f.flush()
+                self.free.put(buffer)
+
+    def close(self):
+        """Restore the bot and wait for the writer to finish the file"""
+        for name, function in self.originals.items():
+            setattr(self.bot, name, function)
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+
+
+def read_trace(path):
+    """Yield (fen, chosen move, seconds, dropped, records) per traced move"""
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            magic, count, dropped, seconds, move, fen_length = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError('%s: not a search trace' % path)
+            fen = f.read(fen_length).decode()
+            data = f.read(count * RECORD.size)
+            yield (fen, move.rstrip(b'\0').decode(), seconds, dropped,
+                   [record for record in RECORD.iter_unpack(data)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('bot')
+    parser.add_argument('--out', default='search.trace')
+    parser.add_argument('--positions', default=None, help='.bin records, .jsonl games or FEN/EPD file')
+    parser.add_argument('--count', type=int, default=20)
+    parser.add_argument('--opponent', default=None, help='play one referee game against this bot instead')
+    parser.add_argument('--capacity', type=int, default=1 << 18, help='records kept per move')
+    parser.add_argument('--sample-moves', type=int, default=1, help='trace one move in this many')
+    parser.add_argument('--max-ply', type=int, default=64)
+    parser.add_argument('--no-qsearch', action='store_true')
+    parser.add_argument('--depth', type=int, default=None, help='FIXED_DEPTH for v13-style bots')
+    args = parser.parse_args()
+
+    bot = load_bot(args.bot)
+    if args.depth is not None and hasattr(bot, 'FIXED_DEPTH'):
+        bot.FIXED_DEPTH = args.depth
+    recorder = TraceRecorder(args.out, args.capacity, args.sample_moves, args.max_ply,
+                             not args.no_qsearch).attach(bot)
+    try:
+        if args.opponent:
+            from referee import play_game
+            game = play_game((bot.chess_bot, load_bot(args.opponent).chess_bot))
+            print('%s after %d plies (%s)' % (game['result'], len(game['moves']), game['reason']))
+        else:
+            for fen in load_positions(args.positions, load_rules(), args.count):
+                bot.chess_bot(make_obs(fen))
+    finally:
+        recorder.close()
+    print('%d of %d moves traced to %s' % (recorder.traced, recorder.calls, args.out))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Self-play data generation into the binary format of tools/records.py.
+
+Games start from a few random plies, are played by one bot against itself
+in a process pool, and every sampled position is written with the search
+score, best move and the final game result. Games still running after
+--max-plies have no result and write no positions.
+
+    python tools/selfplay.py --games 200 --workers 4 --output selfplay.bin
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from botlib import call_seeded, load_bot, load_rules, make_obs
+from records import (RESULT_DRAW, RESULT_LOSS, RESULT_UNKNOWN, RESULT_WIN,
+                     RECORD_SIZE, pack_record)
+
+_bot = None
+_rules = None
+
+
+def _init_worker(bot_name):
+    global _bot, _rules
+    _bot = load_bot(bot_name)
+    # main_v13's Position tracks the game and the rules for every bot
+    _rules = _bot if hasattr(_bot, 'Position') else load_rules()
+
+
+def choose_move(pos, move_time, depth, seed):
+    """Best move and score (side to move's view, None if unknown)"""
+    if hasattr(_bot, 'search'):
+        info = _bot.SearchInfo(max_time=move_time, max_depth=depth)
+        root = _bot.Position(pos.fen)
+        if hasattr(pos, 'game_keys'):
+            root.history = pos.game_keys()
+        move, score, _ = _bot.search(root, info)
+        return move, score
+    uci = call_seeded(_bot, make_obs(pos.fen, remainingOverageTime=10, step=0), seed)
+    return (pos.parse_move(uci) if uci else 0), None
+
+
+def play_game(seed, random_plies, sample_rate, move_time, depth, max_plies):
+    """Play one game and return its packed records"""
+    rng = random.Random(seed)
+    pos = _rules.Position()
+    for _ in range(rng.randrange(random_plies[0], random_plies[1] + 1)):
+        moves = pos.legal_moves()
+        if not moves:
+            break
+        pos.make_move(rng.choice(moves))
+
+    samples = []
+    seen = {}
+    result = RESULT_UNKNOWN
+    for _ in range(max_plies):
+        moves = pos.legal_moves()
+        if not moves:
+            if pos.in_check():
+                result = RESULT_LOSS if pos.side == 0 else RESULT_WIN
+            else:
+                result = RESULT_DRAW
+            break
+        seen[pos.key] = seen.get(pos.key, 0) + 1
+        if pos.halfmove >= 100 or seen[pos.key] >= 3:
+            result = RESULT_DRAW
+            break
+        move, score = choose_move(pos, move_time, depth, seed)
+        if move not in moves:
+            # Illegal or missing move forfeits, as on Kaggle
+            result = RESULT_LOSS if pos.side == 0 else RESULT_WIN
+            break
+        if rng.random() < sample_rate:
+            samples.append((list(pos.squares), pos.side, pos.castling, pos.ep,
+                            pos.halfmove, pos.fullmove, score, move))
+        pos.make_move(move)
+
+    if result == RESULT_UNKNOWN:
+        # An unfinished game has no target for the samples
+        return b'', result
+    return b''.join(pack_record(*sample, result=result) for sample in samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bot', default='v13')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='selfplay.bin')
+    parser.add_argument('--random-plies', type=int, nargs=2, default=(4, 10))
+    parser.add_argument('--sample-rate', type=float, default=0.25)
+    parser.add_argument('--move-time', type=float, default=0.1)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--max-plies', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    start = time.time()
+    records = 0
+    results = [0, 0, 0, 0]
+    with open(args.output, 'ab') as out, \
+            ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(args.bot,)) as pool:
+        futures = [pool.submit(play_game, args.seed * 1000003 + game, args.random_plies,
+                               args.sample_rate, args.move_time, args.depth, args.max_plies)
+                   for game in range(args.games)]
+        for done, future in enumerate(as_completed(futures), 1):
+            data, result = future.result()
+            out.write(data)
+            records += len(data) // RECORD_SIZE
+            results[result] += 1
+            if done % 10 == 0 or done == args.games:
+                print('%d/%d games, %d positions, W/D/L %d/%d/%d, %d unfinished, %.0fs' % (
+                    done, args.games, records, results[RESULT_WIN], results[RESULT_DRAW],
+                    results[RESULT_LOSS], results[RESULT_UNKNOWN], time.time() - start))
+
+
+if __name__ == '__main__':
+    main()
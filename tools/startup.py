@@ -0,0 +1,84 @@
+"""
+Cold-start benchmark: import time and first-move latency, each measured in
+a fresh interpreter. Fails (exit status 1) when the median first call uses
+more than --fraction of the per-move budget.
+
+    python tools/startup.py v13 --runs 5 --budget 1.0 --fraction 0.25
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Run in the child: everything is timed from a cold interpreter
+CHILD = r'''
+import json, sys, time
+sys.path.insert(0, %(tools)r)
+start = time.perf_counter()
+from botlib import load_bot, make_obs
+bot = load_bot(%(bot)r)
+imported = time.perf_counter()
+bot.chess_bot(make_obs(%(fen)r))
+first = time.perf_counter()
+bot.chess_bot(make_obs(%(fen)r))
+second = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'first_call': first - imported,
+    'second_call': second - first,
+    'engine': dict(getattr(bot, 'STARTUP', {})),
+    'numpy_loaded': 'numpy' in sys.modules,
+}))
+'''
+
+
+def measure(bot, fen=START_FEN):
+    """Timings from one fresh interpreter"""
+    tools = os.path.dirname(os.path.abspath(__file__))
+    code = CHILD % {'tools': tools, 'bot': bot, 'fen': fen}
+    output = subprocess.check_output([sys.executable, '-c', code])
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('bot', nargs='?', default='v13')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=1.0, help='seconds per move')
+    parser.add_argument('--fraction', type=float, default=0.25,
+                        help='largest share of the budget the first call may use')
+    parser.add_argument('--fen', default=START_FEN)
+    args = parser.parse_args()
+
+    runs = [measure(args.bot, args.fen) for _ in range(args.runs)]
+    for name in ('import', 'first_call', 'second_call'):
+        values = [run[name] for run in runs]
+        print('%-12s median %7.1f ms  max %7.1f ms' % (
+            name, 1000 * median(values), 1000 * max(values)))
+    engine = [run['engine'] for run in runs if run['engine']]
+    for name in ('import', 'warmup', 'first_call'):
+        values = [e[name] for e in engine if name in e]
+        if values:
+            print('engine %-12s median %7.1f ms' % (name, 1000 * median(values)))
+    print('numpy imported: %s' % ', '.join(str(run['numpy_loaded']) for run in runs))
+
+    limit = args.budget * args.fraction
+    first = median([run['first_call'] for run in runs])
+    if first > limit:
+        print('FAIL: first move %.1f ms over %.1f ms (%.0f%% of %.2fs)' % (
+            1000 * first, 1000 * limit, 100 * args.fraction, args.budget))
+        sys.exit(1)
+    print('ok: first move %.1f ms within %.1f ms' % (1000 * first, 1000 * limit))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Tactical test-suite runner for EPD files with `bm` (best move) or `am`
+(avoid move) operations.
+
+    python tools/tactics.py suite.epd v13 --time 1.0 --workers 4
+    python tools/tactics.py suite.epd v13 --nodes 200000
+
+Bots with `search`/`SearchInfo` run under the time or node limit and
+report when they settled on a correct move: the first finished depth from
+which the best move stayed correct. Older bots are asked once through
+`chess_bot(obs)`, under their own time control, with their random
+choices seeded from --seed.
+"""
+import argparse
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from botlib import call_seeded, load_bot, load_rules, make_obs
+
+PIECE_LETTERS = {'N': 2, 'B': 3, 'R': 4, 'Q': 5, 'K': 6}
+
+
+def parse_epd(line):
+    """(fen, operations) where operations maps opcode -> list of operands"""
+    fields = line.split()
+    fen = ' '.join(fields[:4]) + ' 0 1'
+    operations = {}
+    for op in ' '.join(fields[4:]).split(';'):
+        op = op.strip()
+        if not op:
+            continue
+        parts = op.split(None, 1)
+        operands = parts[1] if len(parts) > 1 else ''
+        if operands.startswith('"'):
+            operations[parts[0]] = [operands.strip('"')]
+        else:
+            operations[parts[0]] = operands.split()
+    return fen, operations
+
+
+def parse_san(pos, san):
+    """Legal move matching a SAN (or UCI) string, or 0"""
+    moves = pos.legal_moves()
+    san = san.rstrip('+#!?')
+    if re.match(r'^[a-h][1-8][a-h][1-8][nbrq]?$', san):
+        move = pos.parse_move(san)
+        return move if move in moves else 0
+    if san in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        long_castle = san.count('O') + san.count('0') == 3
+        for move in moves:
+            frm, to = move & 63, (move >> 6) & 63
+            if pos.squares[frm] & 7 == 6 and abs(to - frm) == 2 and (to < frm) == long_castle:
+                return move
+        return 0
+    match = re.match(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$', san)
+    if not match:
+        return 0
+    piece, from_file, from_rank, target, promo = match.groups()
+    ptype = PIECE_LETTERS[piece] if piece else 1
+    to = (8 - int(target[1])) * 8 + ord(target[0]) - 97
+    candidates = []
+    for move in moves:
+        frm = move & 63
+        if (move >> 6) & 63 != to or pos.squares[frm] & 7 != ptype:
+            continue
+        if from_file and frm % 8 != ord(from_file) - 97:
+            continue
+        if from_rank and 8 - frm // 8 != int(from_rank):
+            continue
+        if (move >> 12) != (PIECE_LETTERS[promo] if promo else 0):
+            continue
+        candidates.append(move)
+    return candidates[0] if len(candidates) == 1 else 0
+
+
+def load_suite(path, rules):
+    """List of (id, fen, best moves, avoid moves) with moves as UCI strings"""
+    suite = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip() or line.startswith('#'):
+                continue
+            fen, ops = parse_epd(line)
+            pos = rules.Position(fen)
+            best = [parse_san(pos, san) for san in ops.get('bm', [])]
+            avoid = [parse_san(pos, san) for san in ops.get('am', [])]
+            if 0 in best + avoid or not (best or avoid):
+                print('skipping line %d: no usable bm/am' % number)
+                continue
+            suite.append((ops.get('id', [str(number)])[0], fen,
+                          [rules.move_to_uci(m) for m in best],
+                          [rules.move_to_uci(m) for m in avoid]))
+    return suite
+
+
+def is_correct(uci, best, avoid):
+    return uci is not None and (uci in best if best else uci not in avoid)
+
+
+_bot = None
+
+
+def _init_worker(bot_name):
+    global _bot
+    _bot = load_bot(bot_name)
+
+
+def solve(entry, max_time, max_nodes, seed=1):
+    """Run one position; returns (id, move, solved, seconds, nodes to solution)"""
+    ident, fen, best, avoid = entry
+    bot = _bot
+    start = time.time()
+    if not hasattr(bot, 'search'):
+        uci = call_seeded(bot, make_obs(fen), seed)
+        elapsed = time.time() - start
+        solved = is_correct(uci, best, avoid)
+        return ident, uci, solved, elapsed if solved else None, None
+
+    info = bot.SearchInfo(max_time=max_time, max_depth=64, max_nodes=max_nodes)
+    # When the current run of correct best moves began
+    found = [None]
+
+    def on_iteration(depth, score, move):
+        if is_correct(bot.move_to_uci(move), best, avoid):
+            if found[0] is None:
+                found[0] = (time.time() - start, info.nodes)
+        else:
+            found[0] = None
+
+    info.on_iteration = on_iteration
+    move, _, _ = bot.search(bot.Position(fen), info)
+    uci = bot.move_to_uci(move) if move else None
+    solved = is_correct(uci, best, avoid) and found[0] is not None
+    seconds, nodes = found[0] if solved else (None, None)
+    return ident, uci, solved, seconds, nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('suite')
+    parser.add_argument('bots', nargs='+')
+    parser.add_argument('--time', type=float, default=1.0, help='seconds per position')
+    parser.add_argument('--nodes', type=int, default=None, help='node limit instead of time')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=1, help="seeds older bots' random choices")
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+
+    suite = load_suite(args.suite, load_rules())
+    max_time = float('inf') if args.nodes else args.time
+    for name in args.bots:
+        start = time.time()
+        with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(name,)) as pool:
+            results = list(pool.map(solve, suite, [max_time] * len(suite),
+                                    [args.nodes] * len(suite), [args.seed] * len(suite)))
+        solved = [r for r in results if r[2]]
+        if not args.quiet:
+            for ident, uci, ok, seconds, nodes in results:
+                detail = ''
+                if ok:
+                    detail = '%.2fs' % seconds + (' %d nodes' % nodes if nodes is not None else '')
+                print('%-8s %-20s %-6s %-4s %s' % (name, ident, uci, 'ok' if ok else '--', detail))
+        times = [r[3] for r in solved]
+        nodes = [r[4] for r in solved if r[4] is not None]
+        print('%s: solved %d/%d, mean time to solution %.2fs%s, wall %.0fs' % (
+            name, len(solved), len(results), sum(times) / len(times) if times else 0.0,
+            ', mean nodes %d' % (sum(nodes) // len(nodes)) if nodes else '',
+            time.time() - start))
+
+
+if __name__ == '__main__':
+    main()
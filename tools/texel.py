@@ -0,0 +1,273 @@
+"""
+Texel tuning of main_v13's tapered material and piece-square tables.
+
+The EPD file is parsed once into a compact on-disk cache (piece indices,
+phase and result as NumPy memmaps); every optimisation pass then streams
+that cache in fixed-size chunks, so 10M positions fit in bounded memory.
+The loss is the mean squared error between the game result and
+sigmoid(K * eval / 400) with eval the linear tapered score, minimised
+with vectorised Adam steps.
+
+    python tools/texel.py positions.epd --epochs 200 --output tuned_tables.py
+"""
+import argparse
+import json
+import os
+import re
+
+import numpy as np
+
+from botlib import load_bot
+
+PIECES = 'PNBRQK'
+MAX_PIECES = 32
+PAD = 2 * 6 * 64  # index used for empty slots
+N_PARAMS = 6 * 64
+PHASE_WEIGHTS = {'N': 1, 'B': 1, 'R': 2, 'Q': 4}
+PHASE_MAX = 24
+RESULT_PATTERNS = [
+    (re.compile(r'c9\s+"?(1-0|0-1|1/2-1/2)"?'), {'1-0': 1.0, '0-1': 0.0, '1/2-1/2': 0.5}),
+    (re.compile(r'\[(1\.0|0\.0|0\.5|1|0)\]'), None),
+    (re.compile(r'(?:^|\s|;)(1-0|0-1|1/2-1/2)(?:\s|;|$)'), {'1-0': 1.0, '0-1': 0.0, '1/2-1/2': 0.5}),
+]
+
+
+def parse_epd_line(line):
+    """Return (piece placement, result in [0, 1]) or None"""
+    fields = line.split()
+    if len(fields) < 2:
+        return None
+    rest = ' '.join(fields[1:])
+    for pattern, mapping in RESULT_PATTERNS:
+        match = pattern.search(rest)
+        if match:
+            token = match.group(1)
+            return fields[0], mapping[token] if mapping else float(token)
+    return None
+
+
+def encode_placement(placement):
+    """Feature indices (white: type*64+sq, black: 384+type*64+mirrored sq) and phase"""
+    indices = []
+    phase = 0
+    sq = 0
+    for char in placement:
+        if char == '/':
+            continue
+        if char.isdigit():
+            sq += int(char)
+            continue
+        upper = char.upper()
+        ptype = PIECES.index(upper)
+        if char.isupper():
+            indices.append(ptype * 64 + sq)
+        else:
+            indices.append(N_PARAMS + ptype * 64 + (sq ^ 56))
+        phase += PHASE_WEIGHTS.get(upper, 0)
+        sq += 1
+    return indices, min(phase, PHASE_MAX)
+
+
+def build_cache(epd_path, cache_dir, chunk_size=100000):
+    """Parse the EPD file once into flat binary arrays; returns the count"""
+    os.makedirs(cache_dir, exist_ok=True)
+    files = {name: open(os.path.join(cache_dir, name + '.bin'), 'wb')
+             for name in ('indices', 'phase', 'result')}
+    count = 0
+    indices = np.full((chunk_size, MAX_PIECES), PAD, dtype=np.int16)
+    phase = np.zeros(chunk_size, dtype=np.uint8)
+    result = np.zeros(chunk_size, dtype=np.float32)
+    filled = 0
+
+    def flush(n):
+        indices[:n].tofile(files['indices'])
+        phase[:n].tofile(files['phase'])
+        result[:n].tofile(files['result'])
+
+    with open(epd_path) as f:
+        for line in f:
+            parsed = parse_epd_line(line)
+            if parsed is None:
+                continue
+            placement, outcome = parsed
+            idx, ph = encode_placement(placement)
+            indices[filled, :len(idx)] = idx
+            indices[filled, len(idx):] = PAD
+            phase[filled] = ph
+            result[filled] = outcome
+            filled += 1
+            count += 1
+            if filled == chunk_size:
+                flush(filled)
+                filled = 0
+    flush(filled)
+    for f in files.values():
+        f.close()
+    with open(os.path.join(cache_dir, 'meta.json'), 'w') as f:
+        json.dump({'count': count, 'source': os.path.abspath(epd_path)}, f)
+    return count
+
+
+def open_cache(cache_dir):
+    with open(os.path.join(cache_dir, 'meta.json')) as f:
+        count = json.load(f)['count']
+    return (np.memmap(os.path.join(cache_dir, 'indices.bin'), np.int16, 'r', shape=(count, MAX_PIECES)),
+            np.memmap(os.path.join(cache_dir, 'phase.bin'), np.uint8, 'r', shape=(count,)),
+            np.memmap(os.path.join(cache_dir, 'result.bin'), np.float32, 'r', shape=(count,)))
+
+
+def iter_chunks(cache, chunk_size):
+    """Yield (param index, sign, middlegame weight, result) per chunk"""
+    indices, phase, result = cache
+    for start in range(0, len(result), chunk_size):
+        idx = np.asarray(indices[start:start + chunk_size], dtype=np.int32)
+        sign = np.where(idx >= N_PARAMS, -1.0, 1.0).astype(np.float32)
+        sign[idx == PAD] = 0.0
+        param = np.where(idx == PAD, N_PARAMS, idx % N_PARAMS)
+        mg_weight = np.asarray(phase[start:start + chunk_size], dtype=np.float32) / PHASE_MAX
+        yield param, sign, mg_weight, np.asarray(result[start:start + chunk_size])
+
+
+def evaluate_chunk(theta, param, sign, mg_weight):
+    """Vectorised tapered eval: theta is (2, N_PARAMS + 1), last column zero"""
+    mg = (theta[0][param] * sign).sum(axis=1)
+    eg = (theta[1][param] * sign).sum(axis=1)
+    return mg * mg_weight + eg * (1.0 - mg_weight)
+
+
+def sigmoid(evals, k):
+    return 1.0 / (1.0 + np.power(10.0, -k * evals / 400.0))
+
+
+def loss_and_gradient(theta, cache, k, chunk_size, with_gradient=True):
+    total_loss = 0.0
+    count = 0
+    grad = np.zeros_like(theta)
+    for param, sign, mg_weight, result in iter_chunks(cache, chunk_size):
+        evals = evaluate_chunk(theta, param, sign, mg_weight)
+        s = sigmoid(evals, k)
+        error = result - s
+        total_loss += float((error * error).sum())
+        count += len(result)
+        if with_gradient:
+            # d loss / d eval per position, then scattered onto the parameters
+            d_eval = -2.0 * error * s * (1.0 - s) * k * np.log(10.0) / 400.0
+            flat = param.ravel()
+            grad[0] += np.bincount(flat, (sign * (d_eval * mg_weight)[:, None]).ravel(),
+                                   minlength=N_PARAMS + 1)
+            grad[1] += np.bincount(flat, (sign * (d_eval * (1.0 - mg_weight))[:, None]).ravel(),
+                                   minlength=N_PARAMS + 1)
+    grad[:, N_PARAMS] = 0.0
+    return total_loss / max(count, 1), grad / max(count, 1)
+
+
+def fit_k(theta, cache, chunk_size):
+    """Golden-section search for the sigmoid scale with the starting tables"""
+    lo, hi = 0.1, 3.0
+    ratio = (5 ** 0.5 - 1) / 2
+    for _ in range(20):
+        a = hi - ratio * (hi - lo)
+        b = lo + ratio * (hi - lo)
+        if loss_and_gradient(theta, cache, a, chunk_size, False)[0] < \
+                loss_and_gradient(theta, cache, b, chunk_size, False)[0]:
+            hi = b
+        else:
+            lo = a
+    return (lo + hi) / 2
+
+
+def initial_theta(bot):
+    """Material folded into the piece-square tables, as the engine's PSQ does"""
+    theta = np.zeros((2, N_PARAMS + 1), dtype=np.float64)
+    for ptype, char in enumerate(PIECES):
+        for sq in range(64):
+            theta[0, ptype * 64 + sq] = bot.MIDGAME_VALUES[char] + bot.MIDGAME_PST[char][sq]
+            theta[1, ptype * 64 + sq] = bot.ENDGAME_VALUES[char] + bot.ENDGAME_PST[char][sq]
+    return theta
+
+
+def split_tables(row):
+    """Separate a folded table into a material value and a zero-mean PST"""
+    values, tables = {}, {}
+    for ptype, char in enumerate(PIECES):
+        table = row[ptype * 64:(ptype + 1) * 64]
+        squares = table[8:56] if char == 'P' else table
+        value = int(round(float(squares.mean()))) if char != 'K' else 0
+        pst = np.rint(table - value).astype(int)
+        if char == 'P':
+            pst[:8] = 0
+            pst[56:] = 0
+        values[char] = value
+        tables[char] = [int(v) for v in pst]
+    return values, tables
+
+
+def format_tables(theta):
+    """Python source for the tuned tables, in the bots' layout"""
+    lines = ['# Tuned by tools/texel.py', '']
+    for name, row in (('MIDGAME', theta[0]), ('ENDGAME', theta[1])):
+        values, tables = split_tables(row)
+        lines.append('%s_VALUES = {%s}' % (name, ', '.join(
+            "'%s': %d" % (c, values[c]) for c in PIECES)))
+    lines.append('')
+    for name, row in (('MIDGAME', theta[0]), ('ENDGAME', theta[1])):
+        _, tables = split_tables(row)
+        lines.append('%s_PST = {' % name)
+        for i, char in enumerate(PIECES):
+            lines.append("    '%s': [" % char)
+            table = tables[char]
+            for rank in range(8):
+                cells = ','.join('%3d' % v for v in table[rank * 8:rank * 8 + 8])
+                lines.append('        ' + cells + (',' if rank < 7 else ''))
+            lines.append('    ]' + (',' if i < len(PIECES) - 1 else ''))
+        lines.append('}')
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def tune(theta, cache, k, epochs, chunk_size, learning_rate=1.0, log=print):
+    """Adam over full passes of the cache"""
+    m = np.zeros_like(theta)
+    v = np.zeros_like(theta)
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    for epoch in range(1, epochs + 1):
+        loss, grad = loss_and_gradient(theta, cache, k, chunk_size)
+        m = beta1 * m + (1 - beta1) * grad
+        v = beta2 * v + (1 - beta2) * grad * grad
+        step = learning_rate * (m / (1 - beta1 ** epoch)) / (np.sqrt(v / (1 - beta2 ** epoch)) + eps)
+        theta -= step
+        theta[:, N_PARAMS] = 0.0
+        if log and (epoch == 1 or epoch % 10 == 0 or epoch == epochs):
+            log('epoch %4d  loss %.6f' % (epoch, loss))
+    return theta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('epd')
+    parser.add_argument('--cache', help='cache directory (default: <epd>.cache)')
+    parser.add_argument('--bot', default='v13', help='engine whose tables seed the tuning')
+    parser.add_argument('--epochs', type=int, default=200)
+    parser.add_argument('--chunk', type=int, default=100000, help='positions per chunk')
+    parser.add_argument('--lr', type=float, default=1.0)
+    parser.add_argument('--k', type=float, help='sigmoid scale; fitted if omitted')
+    parser.add_argument('--output', default='tuned_tables.py')
+    args = parser.parse_args()
+
+    cache_dir = args.cache or args.epd + '.cache'
+    if not os.path.exists(os.path.join(cache_dir, 'meta.json')):
+        print('parsed %d positions into %s' % (build_cache(args.epd, cache_dir, args.chunk), cache_dir))
+    cache = open_cache(cache_dir)
+
+    theta = initial_theta(load_bot(args.bot))
+    k = args.k or fit_k(theta, cache, args.chunk)
+    print('positions %d, K = %.4f, start loss %.6f' % (
+        len(cache[2]), k, loss_and_gradient(theta, cache, k, args.chunk, False)[0]))
+    theta = tune(theta, cache, k, args.epochs, args.chunk, args.lr)
+    with open(args.output, 'w') as f:
+        f.write(format_tables(theta))
+    print('wrote %s' % args.output)
+
+
+if __name__ == '__main__':
+    main()
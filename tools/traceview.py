@@ -0,0 +1,213 @@
+"""
+Offline viewer for searchtrace.py files: rebuilds each traced move's search
+tree and reports the iterations, where the time went (by ply, by how nodes
+ended, heaviest subtrees) and the subtrees that were searched more than
+once at the same depth.
+
+    python tools/traceview.py v12.trace
+    python tools/traceview.py v13.trace --move 3 --tree 2
+
+A repeated subtree is the same move path, or the same position reached
+by another path (a transposition), searched again to the same depth
+within one move. Every search but the last is counted as waste; repeats
+inside a subtree that is already waste are not counted twice. Repeats
+are split by cause: a window re-search follows a fail-high or fail-low
+under a different window (aspiration, PVS), a next-iteration repeat is
+one iterative deepening did not get from the hash table (quiescence is
+never stored there), and the rest are plain repeats and transpositions.
+"""
+import argparse
+
+from botlib import load_rules
+from searchtrace import FAIL_HIGH, FAIL_LOW, LEAF, QSEARCH, REASONS, read_trace
+
+
+class Node(object):
+    __slots__ = ('ply', 'reason', 'depth', 'flags', 'move', 'key', 'alpha', 'beta', 'score',
+                 'start', 'time', 'children', 'size', 'path', 'iteration')
+
+    def __init__(self, record):
+        (self.ply, self.reason, self.depth, self.flags, self.move, self.key, self.alpha,
+         self.beta, self.score, self.start, self.time) = record
+        self.children = []
+        self.size = 1
+        self.path = ()
+        self.iteration = 0
+
+    @property
+    def self_time(self):
+        return max(0, self.time - sum(child.time for child in self.children))
+
+
+def build_tree(records):
+    """Root nodes (one per iteration) from post-order records"""
+    pending = {}
+    for record in records:
+        node = Node(record)
+        node.children = pending.pop(node.ply + 1, [])
+        node.size += sum(child.size for child in node.children)
+        pending.setdefault(node.ply, []).append(node)
+    # Whatever has no parent left: the roots, or the tops of a truncated trace
+    roots = [node for ply in sorted(pending) for node in pending[ply]]
+    roots.sort(key=lambda node: node.start)
+    for iteration, root in enumerate(roots):
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            node.iteration = iteration
+            for child in node.children:
+                # Handing over to quiesce makes no move; the path stays the parent's
+                child.path = node.path + (child.move,) if child.move else node.path
+                stack.append(child)
+    return roots
+
+
+def walk(roots):
+    stack = list(reversed(roots))
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.children))
+
+
+def find_repeats(roots):
+    """
+    (kind, nodes, wasted microseconds) per group of repeated searches,
+    counting only repeats that are not already inside a wasted subtree
+    """
+    by_path, by_key = {}, {}
+    for node in walk(roots):
+        if node.ply:
+            by_path.setdefault((node.path, node.depth, node.flags & QSEARCH), []).append(node)
+    for nodes in by_path.values():
+        # One representative per path, so a position repeated along one path is not a transposition
+        latest = max(nodes, key=lambda node: node.start)
+        by_key.setdefault((latest.key, latest.depth, latest.flags & QSEARCH), []).append(latest)
+
+    wasted = {}
+    groups = []
+    for kind, table in (('same path', by_path), ('transposition', by_key)):
+        for nodes in table.values():
+            if len(nodes) < 2:
+                continue
+            nodes.sort(key=lambda node: node.start)
+            last = nodes[-1]
+            if kind == 'same path':
+                if any(n.reason in (FAIL_HIGH, FAIL_LOW) and (n.alpha, n.beta) != (last.alpha, last.beta)
+                       for n in nodes[:-1]):
+                    kind = 'window re-search'
+                elif nodes[0].iteration != last.iteration:
+                    kind = 'next iteration'
+            groups.append([kind, nodes, 0])
+            for node in nodes[:-1]:
+                wasted.setdefault(id(node), groups[-1])
+
+    # Charge each wasted node to its group unless an ancestor is already wasted
+    stack = [(root, False) for root in roots]
+    while stack:
+        node, inside = stack.pop()
+        group = wasted.get(id(node))
+        if group is not None and not inside:
+            group[2] += node.time
+        stack.extend((child, inside or group is not None) for child in node.children)
+    return [group for group in groups if group[2]]
+
+
+def show_tree(node, max_ply, rules, indent=0):
+    if node.ply > max_ply:
+        return
+    print('%s%-6s d=%-3d [%d, %d] %6d %-9s %8.2f ms %7d nodes%s' % (
+        '  ' * indent, describe_move(node.move, rules), node.depth, node.alpha, node.beta,
+        node.score, REASONS[node.reason], node.time / 1000.0, node.size,
+        ' q' if node.flags & QSEARCH else ''))
+    for child in node.children:
+        show_tree(child, max_ply, rules, indent + 1)
+
+
+def describe_move(move, rules):
+    return rules.move_to_uci(move) if move else '-'
+
+
+def describe_path(path, rules):
+    return ' '.join(describe_move(move, rules) for move in path) or '(root)'
+
+
+def report(index, entry, rules, top, tree):
+    fen, chosen, seconds, dropped, records = entry
+    roots = build_tree(records)
+    nodes = list(walk(roots))
+    total = sum(root.time for root in roots) or 1
+    print('move %d: %s -> %s, %.1f ms, %d nodes recorded%s' % (
+        index, fen, chosen or '(none)', 1000 * seconds, len(nodes),
+        ', %d oldest dropped' % dropped if dropped else ''))
+    if not nodes:
+        print('  no search nodes recorded: the move was chosen before alpha_beta ran')
+        return 0, 0
+
+    for root in roots:
+        print('  iteration d=%-3d score %6d %-9s %8.1f ms %8d nodes' % (
+            root.depth, root.score, REASONS[root.reason], root.time / 1000.0, root.size))
+
+    plies = {}
+    for node in nodes:
+        count, spent = plies.get(node.ply, (0, 0))
+        plies[node.ply] = (count + 1, spent + node.self_time)
+    print('  time by ply (self time):')
+    for ply in sorted(plies):
+        count, spent = plies[ply]
+        print('    ply %2d %8d nodes %9.1f ms %5.1f%%' % (ply, count, spent / 1000.0, 100.0 * spent / total))
+
+    reasons = {}
+    for node in nodes:
+        kind = REASONS[node.reason] + (' q' if node.flags & QSEARCH else '') + \
+            (' leaf' if node.flags & LEAF and not node.flags & QSEARCH else '')
+        count, spent = reasons.get(kind, (0, 0))
+        reasons[kind] = (count + 1, spent + node.self_time)
+    print('  how nodes ended:')
+    for kind, (count, spent) in sorted(reasons.items(), key=lambda item: -item[1][1]):
+        print('    %-18s %8d nodes %9.1f ms' % (kind, count, spent / 1000.0))
+
+    heavy = sorted((node for node in nodes if 1 <= node.ply <= 2), key=lambda node: -node.time)
+    print('  heaviest subtrees:')
+    for node in heavy[:top]:
+        print('    %8.1f ms %5.1f%% %7d nodes d=%-3d %-9s %s' % (
+            node.time / 1000.0, 100.0 * node.time / total, node.size, node.depth,
+            REASONS[node.reason], describe_path(node.path, rules)))
+
+    repeats = find_repeats(roots)
+    waste = sum(group[2] for group in repeats)
+    print('  searched again: %.1f ms (%.1f%%) in %d groups' % (
+        waste / 1000.0, 100.0 * waste / total, len(repeats)))
+    for kind, group, spent in sorted(repeats, key=lambda group: -group[2])[:top]:
+        print('    %8.1f ms x%-3d d=%-3d %-16s %s%s' % (
+            spent / 1000.0, len(group), group[0].depth, kind, describe_path(group[-1].path, rules),
+            '' if kind != 'transposition' else ' (also %s)' % describe_path(group[0].path, rules)))
+
+    if tree is not None:
+        for root in roots:
+            show_tree(root, tree, rules)
+    return waste, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('trace')
+    parser.add_argument('--move', type=int, default=None, help='only this traced move (from 1)')
+    parser.add_argument('--top', type=int, default=8)
+    parser.add_argument('--tree', type=int, default=None, help='print the tree down to this ply')
+    args = parser.parse_args()
+
+    rules = load_rules()
+    waste = total = 0
+    for index, entry in enumerate(read_trace(args.trace), 1):
+        if args.move is not None and index != args.move:
+            continue
+        move_waste, move_total = report(index, entry, rules, args.top, args.tree)
+        waste += move_waste
+        total += move_total
+    if args.move is None and total:
+        print('all moves: %.1f%% of search time went into subtrees searched again' % (100.0 * waste / total))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""
+UCI front-end for the bots, so GUIs and match runners can drive them.
+
+    python tools/uci.py v13
+
+Bots exposing `search`/`SearchInfo` (main_v13 and later) get the full
+protocol: depth, node and time limits, `info` lines while searching,
+`stop` and pondering (`go ponder`, then `ponderhit` or `stop`). Older
+bots are asked for a move through `chess_bot(obs)` and ignore limits. Standard input is read by its own thread, so `stop` and
+`isready` are answered while a search runs.
+"""
+import argparse
+import queue
+import sys
+import threading
+import time
+
+from botlib import load_bot, load_rules, make_obs
+
+ENGINE_AUTHOR = 'PawanRamaMali'
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Clock handling for `go wtime/btime`: a share of the remaining time plus
+# most of the increment, never more than half the clock
+DEFAULT_MOVES_TO_GO = 30
+INCREMENT_SHARE = 0.8
+MOVE_OVERHEAD = 0.05
+
+
+def allocate_time(time_left, increment=0.0, moves_to_go=None):
+    """Seconds to spend on this move from the remaining clock"""
+    moves_to_go = moves_to_go or DEFAULT_MOVES_TO_GO
+    budget = time_left / moves_to_go + increment * INCREMENT_SHARE
+    return max(0.01, min(budget, time_left / 2) - MOVE_OVERHEAD)
+
+
+def parse_go(tokens):
+    """Limits of a `go` command as a dict of numbers and flags"""
+    limits = {}
+    flags = ('infinite', 'ponder')
+    numeric = ('wtime', 'btime', 'winc', 'binc', 'movestogo', 'depth', 'nodes',
+               'movetime', 'mate')
+    i = 0
+    while i < len(tokens):
+        name = tokens[i]
+        if name in flags:
+            limits[name] = True
+        elif name in numeric and i + 1 < len(tokens):
+            limits[name] = int(tokens[i + 1])
+            i += 1
+        i += 1
+    return limits
+
+
+def format_score(bot, score):
+    if abs(score) > bot.MATE_BOUND:
+        plies = bot.MATE_SCORE - abs(score)
+        moves = (plies + 1) // 2
+        return 'mate %d' % (moves if score > 0 else -moves)
+    return 'cp %d' % score
+
+
+class UciEngine(object):
+    """Protocol state: the bot, the current game and the running search"""
+
+    def __init__(self, bot, out=sys.stdout):
+        self.bot = bot
+        self.rules = bot if hasattr(bot, 'Position') else load_rules()
+        self.searchable = hasattr(bot, 'search')
+        self.out = out
+        self.out_lock = threading.Lock()
+        self.position = self.rules.Position(START_FEN)
+        self.info = None
+        self.thread = None
+        # Set while a `go ponder` search runs on the opponent's time; the
+        # clock budget it would have had is applied at `ponderhit`
+        self.pondering = False
+        self.ponder_time = None
+
+    def send(self, line):
+        with self.out_lock:
+            self.out.write(line + '\n')
+            self.out.flush()
+
+    # Commands
+
+    def uci(self):
+        self.send('id name %s' % getattr(self.bot, '__name__', 'bot'))
+        self.send('id author %s' % ENGINE_AUTHOR)
+        if hasattr(self.bot, 'configure_memory'):
+            self.send('option name Hash type spin default %d min 1 max 4096'
+                      % self.bot.MEMORY_BUDGET_MB)
+        if hasattr(self.bot, 'new_position'):
+            self.send('option name Evaluator type combo default %s var classic var nnue'
+                      % self.bot.EVALUATOR)
+        if self.searchable:
+            self.send('option name Ponder type check default false')
+        self.send('uciok')
+
+    def setoption(self, tokens):
+        text = ' '.join(tokens)
+        if 'value' not in tokens or 'name' not in tokens:
+            return
+        name = text.split('name', 1)[1].split('value', 1)[0].strip().lower()
+        value = text.split('value', 1)[1].strip()
+        if name == 'hash' and hasattr(self.bot, 'configure_memory'):
+            self.wait()
+            self.bot.configure_memory(int(value))
+        elif name == 'evaluator' and hasattr(self.bot, 'new_position'):
+            self.wait()
+            if value != self.bot.EVALUATOR:
+                # Stored scores are on the old evaluator's scale, and only
+                # the network gets an eval cache: reallocate everything
+                self.bot.EVALUATOR = value
+                self.bot.configure_memory(self.bot.get_tables().budget_mb)
+
+    def new_game(self):
+        self.wait()
+        if hasattr(self.bot, 'get_tables'):
+            self.bot.get_tables().tt.clear()
+        self.position = self.rules.Position(START_FEN)
+
+    def set_position(self, tokens):
+        """`position startpos|fen <fen> [moves ...]`; moves keep the game history"""
+        self.wait()
+        if 'moves' in tokens:
+            split = tokens.index('moves')
+            tokens, moves = tokens[:split], tokens[split + 1:]
+        else:
+            moves = []
+        if tokens and tokens[0] == 'fen':
+            fen = ' '.join(tokens[1:])
+        else:
+            fen = START_FEN
+        position = self.rules.Position(fen)
+        for uci in moves:
+            position.apply_move(uci)
+        self.position = position
+
+    def go(self, tokens):
+        self.wait()
+        limits = parse_go(tokens)
+        target = self.run_chess_bot
+        if self.searchable:
+            # Set up before the thread starts so an early ponderhit finds it
+            target = self.run_search
+            max_time, max_depth, max_nodes = self.search_limits(limits)
+            self.pondering = bool(limits.get('ponder'))
+            if self.pondering:
+                # The clock only starts at ponderhit; until then search freely
+                self.ponder_time, max_time = max_time, float('inf')
+            self.info = self.bot.SearchInfo(max_time=max_time, max_depth=max_depth,
+                                            max_nodes=max_nodes)
+        self.thread = threading.Thread(target=target, args=(limits,), name='search')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def ponderhit(self):
+        """The expected reply was played: the ponder search becomes the real one"""
+        info = self.info
+        if info is not None and self.pondering:
+            info.start_time = time.time()
+            info.max_time = self.ponder_time
+        self.pondering = False
+
+    def stop(self):
+        self.pondering = False
+        if self.info is not None:
+            self.info.stopped = True
+        self.wait()
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    # Searching
+
+    def search_limits(self, limits):
+        """(max_time, max_depth, max_nodes) for SearchInfo"""
+        max_time = float('inf')
+        if 'movetime' in limits:
+            max_time = max(0.01, limits['movetime'] / 1000.0 - MOVE_OVERHEAD)
+        elif not limits.get('infinite'):
+            side = self.position.side
+            clock = limits.get('btime' if side else 'wtime')
+            if clock is not None:
+                increment = limits.get('binc' if side else 'winc', 0)
+                max_time = allocate_time(clock / 1000.0, increment / 1000.0,
+                                         limits.get('movestogo'))
+        max_depth = limits.get('depth', 64)
+        if 'mate' in limits:
+            max_depth = min(max_depth, 2 * limits['mate'] - 1)
+        return max_time, max_depth, limits.get('nodes')
+
+    def root(self):
+        """Copy of the current position for the search, with its game history"""
+        if hasattr(self.bot, 'new_position'):
+            # The position class decides the evaluator (classic or NNUE)
+            root = self.bot.new_position(self.position.fen)
+        else:
+            root = self.bot.Position(self.position.fen)
+        if hasattr(self.position, 'game_keys'):
+            root.history = self.position.game_keys()
+        return root
+
+    def run_search(self, limits):
+        bot = self.bot
+        info = self.info
+        root = self.root()
+        start = time.time()
+
+        def report(depth, score, move):
+            elapsed = max(time.time() - start, 1e-6)
+            pv = bot.principal_variation(root, move, depth)
+            self.send('info depth %d score %s nodes %d nps %d time %d pv %s' % (
+                depth, format_score(bot, score), info.nodes, info.nodes / elapsed,
+                1000 * elapsed, ' '.join(bot.move_to_uci(m) for m in pv)))
+
+        info.on_iteration = report
+        move, _, _ = bot.search(root, info)
+        # `go infinite` and an unresolved ponder must not answer before `stop`
+        while (limits.get('infinite') or self.pondering) and not info.stopped:
+            time.sleep(0.005)
+        self.info = None
+        if not move:
+            self.send('bestmove 0000')
+            return
+        pv = bot.principal_variation(root, move, 2)
+        if len(pv) > 1:
+            self.send('bestmove %s ponder %s' % (bot.move_to_uci(move), bot.move_to_uci(pv[1])))
+        else:
+            self.send('bestmove %s' % bot.move_to_uci(move))
+
+    def run_chess_bot(self, limits):
+        move = self.bot.chess_bot(make_obs(self.position.fen))
+        self.send('bestmove %s' % (move or '0000'))
+
+    def handle(self, line):
+        """Run one command; False after `quit`"""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == 'uci':
+            self.uci()
+        elif command == 'isready':
+            self.send('readyok')
+        elif command == 'setoption':
+            self.setoption(args)
+        elif command == 'ucinewgame':
+            self.new_game()
+        elif command == 'position':
+            self.set_position(args)
+        elif command == 'go':
+            self.go(args)
+        elif command == 'ponderhit':
+            self.ponderhit()
+        elif command == 'stop':
+            self.stop()
+        elif command == 'quit':
+            self.stop()
+            return False
+        elif command == 'd':
+            self.send(self.position.fen)
+        return True
+
+
+def read_lines(stream, lines):
+    """Feed stdin into a queue so the command loop never blocks on input"""
+    for line in stream:
+        lines.put(line.strip())
+    lines.put('quit')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('bot', nargs='?', default='v13')
+    args = parser.parse_args()
+
+    engine = UciEngine(load_bot(args.bot))
+    lines = queue.Queue()
+    reader = threading.Thread(target=read_lines, args=(sys.stdin, lines), name='stdin')
+    reader.daemon = True
+    reader.start()
+    while engine.handle(lines.get()):
+        pass
+
+
+if __name__ == '__main__':
+    main()